@@ -0,0 +1,76 @@
+"""Compare two benchmark result files produced by ``benchmarks.run``.
+
+Usage:
+    python -m benchmarks.compare bench_results/<old>.json bench_results/<new>.json
+"""
+import argparse
+import json
+import sys
+
+# (section, metric, higher_is_better)
+METRICS = [
+    ("url_ingest", "pages_per_sec", True),
+    ("url_ingest", "chunks_per_sec", True),
+    ("pdf_ingest", "pages_per_sec", True),
+    ("pdf_ingest", "chunks_per_sec", True),
+    ("chat", "p50_ms", False),
+    ("chat", "p95_ms", False),
+    ("chat", "p99_ms", False),
+    (None, "peak_rss_mb", False),
+]
+
+
+def _value(result, section, metric):
+    return result.get(metric) if section is None else result.get(section, {}).get(metric)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    base_by_size = {r["corpus_pages"]: r for r in baseline["results"]}
+    regressions = []
+    rows = []
+    for result in candidate["results"]:
+        size = result["corpus_pages"]
+        if size not in base_by_size:
+            continue
+        for section, metric, higher_is_better in METRICS:
+            old = _value(base_by_size[size], section, metric)
+            new = _value(result, section, metric)
+            if not old or new is None:
+                continue
+            change = 100 * (new - old) / old
+            worse = -change if higher_is_better else change
+            name = f"{section}.{metric}" if section else metric
+            rows.append((size, name, old, new, change))
+            if worse > threshold:
+                regressions.append((size, name, change))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"baseline:  {baseline.get('commit')}\ncandidate: {candidate.get('commit')}")
+    print(f"{'pages':>6} {'metric':<26} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for size, name, old, new, change in rows:
+        print(f"{size:>6} {name:<26} {old:>12.2f} {new:>12.2f} {change:>+8.1f}%")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold}%:")
+        for size, name, change in regressions:
+            print(f"  {size} pages: {name} {change:+.1f}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Synthetic documentation corpora: a static docs site and generated PDFs."""
+import functools
+import os
+import random
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+TOPICS = [
+    "routing", "dependency injection", "middleware", "authentication",
+    "deployment", "background tasks", "websockets", "testing",
+    "configuration", "database sessions", "response models", "validation",
+]
+VOCABULARY = (
+    "the application request response handler endpoint parameter returns "
+    "configure server client token session path query body header status "
+    "async function decorator instance default value error raise install "
+    "package module import settings environment docker worker process"
+).split()
+
+
+def _paragraphs(rng: random.Random, topic: str, count: int):
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(4, 8)):
+            words = rng.choices(VOCABULARY, k=rng.randint(8, 16))
+            words.insert(rng.randrange(len(words)), topic)
+            sentences.append(" ".join(words).capitalize() + ".")
+        yield " ".join(sentences)
+
+
+def page_texts(n_pages: int, paragraphs_per_page: int = 6, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(n_pages):
+        topic = TOPICS[i % len(TOPICS)]
+        yield topic, list(_paragraphs(rng, topic, paragraphs_per_page))
+
+
+def build_docs_site(root: str, n_pages: int, paragraphs_per_page: int = 6) -> int:
+    os.makedirs(root, exist_ok=True)
+    links = []
+    for i, (topic, paragraphs) in enumerate(page_texts(n_pages, paragraphs_per_page)):
+        name = f"page_{i}.html"
+        body = "\n".join(f"<p>{p}</p>" for p in paragraphs)
+        with open(os.path.join(root, name), "w", encoding="utf-8") as f:
+            f.write(
+                f"<html><head><title>{topic}</title><style>p {{}}</style></head>"
+                f"<body><h1>{topic.title()} ({i})</h1>{body}"
+                f'<a href="index.html">Home</a></body></html>'
+            )
+        links.append(f'<li><a href="{name}">{topic.title()} ({i})</a></li>')
+
+    with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+        f.write(
+            "<html><head><title>Docs</title></head><body><h1>Documentation</h1>"
+            f"<ul>{''.join(links)}</ul></body></html>"
+        )
+    return n_pages + 1
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def log_request(self, code="-", size="-"):
+        status = str(getattr(code, "value", code))
+        with self.server.stats_lock:
+            self.server.stats[status] = self.server.stats.get(status, 0) + 1
+
+
+class StaticSite:
+    def __init__(self, root: str, port: int = 0):
+        handler = functools.partial(_QuietHandler, directory=root)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        self._server.stats = {}
+        self._server.stats_lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        """Responses served so far, by HTTP status code."""
+        return dict(self._server.stats)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90):
+    line = []
+    for word in text.split():
+        if line and sum(len(w) + 1 for w in line) + len(word) > width:
+            yield " ".join(line)
+            line = []
+        line.append(word)
+    if line:
+        yield " ".join(line)
+
+
+def build_pdf(path: str, n_pages: int, paragraphs_per_page: int = 6) -> int:
+    # Minimal hand-written PDF 1.4 with one Helvetica text stream per page,
+    # enough for PyPDFLoader to extract text without extra dependencies.
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for topic, paragraphs in page_texts(n_pages, paragraphs_per_page, seed=1):
+        lines = [topic.title()] + [l for p in paragraphs for l in _wrap(p)]
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(
+            f"({_pdf_escape(line)}) '" for line in lines[:70]
+        ) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+    return n_pages
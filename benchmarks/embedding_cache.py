@@ -0,0 +1,72 @@
+"""On-disk embedding cache so retrieval evaluations can run offline."""
+import hashlib
+import os
+from typing import List, Union
+
+import numpy as np
+from loguru import logger
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbed:
+    """Embedder with the MistralEmbed interface backed by an ``.npz`` cache.
+
+    Misses are delegated to ``embedder`` when one is given, otherwise they
+    raise ``KeyError`` so an offline run never silently goes to the network.
+    """
+
+    def __init__(self, path: str, embedder=None):
+        self.path = path
+        self.embedder = embedder
+        self.hits = 0
+        self.misses = 0
+        self._vectors = {}
+        self._dirty = False
+        if os.path.exists(path):
+            data = np.load(path)
+            self._vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+            logger.info(f"Loaded {len(self._vectors)} cached embeddings from {path}")
+
+    def _lookup(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(text) for text in texts]
+        missing = list(dict.fromkeys(
+            (key, text) for key, text in zip(keys, texts) if key not in self._vectors
+        ))
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            if self.embedder is None:
+                raise KeyError(
+                    f"{len(missing)} texts are not in the embedding cache {self.path}"
+                )
+            vectors = self.embedder.embed_documents([text for _, text in missing])
+            for (key, _), vector in zip(missing, vectors):
+                self._vectors[key] = np.asarray(vector, dtype=np.float32)
+            self._dirty = True
+        return [self._vectors[key].tolist() for key in keys]
+
+    def embed_documents(
+        self, texts: Union[str, List[str]], **kwargs
+    ) -> List[List[float]]:
+        if isinstance(texts, str):
+            texts = [texts]
+        return self._lookup(texts)
+
+    def embed_query(self, text: str, **kwargs) -> List[float]:
+        return self._lookup([text])[0]
+
+    def save(self):
+        if not self._dirty:
+            return
+        keys = list(self._vectors)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        np.savez(
+            self.path,
+            keys=np.array(keys),
+            vectors=np.stack([self._vectors[key] for key in keys]),
+        )
+        self._dirty = False
+        logger.info(f"Saved {len(keys)} embeddings to {self.path}")
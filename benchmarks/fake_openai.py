@@ -0,0 +1,133 @@
+"""OpenAI-compatible stand-in for the Mistral chat and embeddings API."""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIM = 1024
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM):
+    # Hashed bag of words: deterministic and similar texts land close together,
+    # which keeps retrieval results meaningful without a real model.
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        stats = self.server.stats
+
+        if self.path.endswith("/embeddings"):
+            texts = request.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+            time.sleep(self.server.embed_latency)
+            with stats["lock"]:
+                stats["embedding_requests"] += 1
+                stats["embedded_texts"] += len(texts)
+            tokens = sum(len(text.split()) for text in texts)
+            self._send_json(
+                {
+                    "object": "list",
+                    "model": request.get("model", "mistral-embed"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+                        for i, text in enumerate(texts)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                }
+            )
+        elif self.path.endswith("/chat/completions"):
+            messages = request.get("messages", [])
+            time.sleep(self.server.chat_latency)
+            with stats["lock"]:
+                stats["chat_requests"] += 1
+            prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+            answer = "This is a canned answer from the benchmark stand-in server."
+            self._send_json(
+                {
+                    "id": f"chatcmpl-{stats['chat_requests']}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mistral-large-latest"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": answer},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(answer.split()),
+                        "total_tokens": prompt_tokens + len(answer.split()),
+                    },
+                }
+            )
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+
+class FakeOpenAIServer:
+    def __init__(
+        self, chat_latency: float = 0.0, embed_latency: float = 0.0, port: int = 0
+    ):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.chat_latency = chat_latency
+        self._server.embed_latency = embed_latency
+        self._server.stats = {
+            "lock": threading.Lock(),
+            "chat_requests": 0,
+            "embedding_requests": 0,
+            "embedded_texts": 0,
+        }
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def stats(self) -> dict:
+        return {k: v for k, v in self._server.stats.items() if k != "lock"}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
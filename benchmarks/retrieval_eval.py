@@ -0,0 +1,286 @@
+"""Retrieval quality vs. latency sweep over retriever, diversity and reranker configs.
+
+Usage:
+    python -m benchmarks.retrieval_eval --corpus corpus.jsonl \\
+        --queries queries.jsonl --embeddings bench_results/embeddings.npz
+    python -m benchmarks.retrieval_eval --synthetic 40
+
+``corpus.jsonl`` holds ``{"id": ..., "text": ...}`` chunks and
+``queries.jsonl`` holds ``{"question": ..., "relevant": [ids]}``. The sweep
+covers every retriever, diversity stage and reranker in
+``config/components/*.yaml`` and
+reports recall@k, MRR and nDCG@k next to per-query latency and token cost.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from loguru import logger
+from omegaconf import OmegaConf
+
+from .embedding_cache import CachedEmbed
+from .fake_openai import fake_embedding
+from .run import ROOT, percentile
+
+METRICS = ("recall", "mrr", "ndcg")
+
+
+class HashEmbed:
+    def embed_documents(self, texts, **kwargs):
+        return [fake_embedding(text) for text in texts]
+
+    def embed_query(self, text, **kwargs):
+        return fake_embedding(text)
+
+
+def load_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_dataset(n_pages: int, n_queries: int, seed: int = 0):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ser", "tan", "vo", "dre", "pul", "gen", "ix", "ro", "fa"]
+    vocabulary = sorted(
+        {"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(3000)}
+    )
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    corpus = []
+    for i in range(n_pages):
+        for j in range(6):
+            words = rng.choices(vocabulary, weights=weights, k=rng.randint(60, 120))
+            corpus.append({"id": f"p{i}-{j}", "text": " ".join(words)})
+    queries = []
+    for chunk in rng.sample(corpus, min(n_queries, len(corpus))):
+        words = chunk["text"].split()
+        start = rng.randrange(len(words) - 10)
+        queries.append({"question": " ".join(words[start:start + 10]), "relevant": [chunk["id"]]})
+    return corpus, queries
+
+
+def score_ranking(ranked_ids, relevant, k):
+    ranked_ids = ranked_ids[:k]
+    hits = [doc_id in relevant for doc_id in ranked_ids]
+    recall = sum(hits) / len(relevant) if relevant else 0.0
+    mrr = next((1 / rank for rank, hit in enumerate(hits, start=1) if hit), 0.0)
+    dcg = sum(1 / math.log2(rank + 1) for rank, hit in enumerate(hits, start=1) if hit)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return {"recall": recall, "mrr": mrr, "ndcg": dcg / ideal if ideal else 0.0}
+
+
+def sweep_configs(config_dir, ks, retrievers=None, rerankers=None, diversities=None):
+    retriever_cfg = OmegaConf.load(os.path.join(config_dir, "retriever.yaml")).retriever
+    diversity_cfg = OmegaConf.load(os.path.join(config_dir, "diversity.yaml")).diversity
+    reranker_cfg = OmegaConf.load(os.path.join(config_dir, "reranker.yaml")).reranker
+
+    retriever_names = [
+        name for name in retriever_cfg
+        if name != "name" and (not retrievers or name in retrievers)
+    ]
+    reranker_names = [None] + [
+        name for name in reranker_cfg
+        if name != "name" and (not rerankers or name in rerankers)
+    ]
+    diversity_names = [
+        name for name in ["none"] + list(diversity_cfg)
+        if name != "name" and (not diversities or name in diversities)
+    ]
+    for retriever, diversity, reranker in itertools.product(
+        retriever_names, diversity_names, reranker_names
+    ):
+        fetch_ks = ks or [retriever_cfg[retriever].get("k", 4)]
+        for fetch_k in fetch_ks:
+            if reranker is None:
+                final_ks = [fetch_k]
+            else:
+                final_ks = [k for k in (ks or [reranker_cfg[reranker].get("k", 4)]) if k <= fetch_k]
+            for final_k in final_ks:
+                cfg = {"retriever": {**OmegaConf.to_container(retriever_cfg[retriever]),
+                                     "name": retriever, "k": fetch_k}}
+                if diversity != "none":
+                    # The diversity stage narrows its own candidate pool down to
+                    # fetch_k, so the reranker sees as many chunks as without it.
+                    params = diversity_cfg[diversity]
+                    cfg["diversity"] = {**OmegaConf.to_container(params), "name": diversity,
+                                        "k": fetch_k,
+                                        "fetch_k": max(params.get("fetch_k", fetch_k), fetch_k)}
+                if reranker is not None:
+                    cfg["reranker"] = {**OmegaConf.to_container(reranker_cfg[reranker]),
+                                       "name": reranker, "k": final_k}
+                yield OmegaConf.create(cfg), final_k
+
+
+def evaluate_config(cfg, final_k, store, queries, text_ids):
+    from src.diversity import retrieve_diverse_chunks, uses_query_vector
+    from src.reranker import rerank_chunks
+    from src.utils import get_token_count_embedding
+
+    totals = {metric: 0.0 for metric in METRICS}
+    latencies, embed_tokens, context_tokens = [], 0, 0
+    for query in queries:
+        question = query["question"]
+        start = time.perf_counter()
+        texts = [doc.page_content for doc in retrieve_diverse_chunks(cfg, question, store)]
+        if "reranker" in cfg:
+            texts = rerank_chunks(cfg, question, texts)
+        latencies.append(time.perf_counter() - start)
+
+        ranked_ids = [doc_id for text in texts for doc_id in text_ids.get(text, [])]
+        for metric, value in score_ranking(ranked_ids, set(query["relevant"]), final_k).items():
+            totals[metric] += value
+        if uses_query_vector(cfg):
+            embed_tokens += get_token_count_embedding(question)
+        context_tokens += sum(get_token_count_embedding(text) for text in texts[:final_k])
+
+    n = len(queries)
+    return {
+        "retriever": cfg.retriever.name,
+        "fetch_k": cfg.retriever.k,
+        "diversity": cfg.diversity.name if "diversity" in cfg else None,
+        "reranker": cfg.reranker.name if "reranker" in cfg else None,
+        "k": final_k,
+        **{f"{metric}@k": totals[metric] / n for metric in METRICS},
+        "latency_p50_ms": 1000 * percentile(latencies, 50),
+        "latency_p95_ms": 1000 * percentile(latencies, 95),
+        "latency_mean_ms": 1000 * sum(latencies) / n,
+        "embed_tokens_per_query": embed_tokens / n,
+        "context_tokens_per_query": context_tokens / n,
+    }
+
+
+def cheapest(results, metric, target, cost):
+    key = "latency_mean_ms" if cost == "latency" else "context_tokens_per_query"
+    passing = [r for r in results if r[f"{metric}@k"] >= target]
+    return min(passing, key=lambda r: (r[key], -r[f"{metric}@k"])) if passing else None
+
+
+def print_results(results):
+    print(
+        f"{'retriever':<12} {'fetch':>5} {'diversity':<9} {'reranker':<13} {'k':>3} {'recall':>7} {'mrr':>6} "
+        f"{'ndcg':>6} {'p50 ms':>8} {'p95 ms':>8} {'emb tok':>8} {'ctx tok':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['retriever']:<12} {r['fetch_k']:>5} {str(r['diversity'] or '-'):<9} "
+            f"{str(r['reranker'] or '-'):<13} {r['k']:>3} "
+            f"{r['recall@k']:>7.3f} {r['mrr@k']:>6.3f} {r['ndcg@k']:>6.3f} "
+            f"{r['latency_p50_ms']:>8.2f} {r['latency_p95_ms']:>8.2f} "
+            f"{r['embed_tokens_per_query']:>8.1f} {r['context_tokens_per_query']:>8.1f}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="JSONL file with id/text chunks")
+    parser.add_argument("--queries", help="JSONL file with question/relevant labels")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="PAGES",
+                        help="Use a generated corpus and hashed embeddings instead")
+    parser.add_argument("--n-queries", type=int, default=50,
+                        help="Number of queries for --synthetic")
+    parser.add_argument("--embeddings", default=os.path.join(ROOT, "bench_results", "embeddings.npz"),
+                        help="Embedding cache (.npz)")
+    parser.add_argument("--online", action="store_true",
+                        help="Fill embedding cache misses from the Mistral API and "
+                             "allow model downloads")
+    parser.add_argument("--config-dir", default=os.path.join(ROOT, "config", "components"))
+    parser.add_argument("--k", default=None,
+                        help="Comma-separated k values to sweep (default: k from config)")
+    parser.add_argument("--retrievers", default=None, help="Comma-separated subset")
+    parser.add_argument("--diversity", default=None,
+                        help="Comma-separated subset of diversity stages (none, mmr)")
+    parser.add_argument("--rerankers", default=None, help="Comma-separated subset")
+    parser.add_argument("--target-metric", choices=METRICS, default="ndcg")
+    parser.add_argument("--target", type=float, default=None,
+                        help="Quality target used to pick the cheapest configuration")
+    parser.add_argument("--cost", choices=("latency", "tokens"), default="latency")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    if args.synthetic is None and not (args.corpus and args.queries):
+        parser.error("either --synthetic or both --corpus and --queries are required")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    if not args.online:
+        # Use only locally cached cross-encoder weights instead of retrying the hub.
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+    from langchain_core.vectorstores import InMemoryVectorStore
+
+    if args.synthetic is not None:
+        corpus, queries = synthetic_dataset(args.synthetic, args.n_queries)
+        embedder = HashEmbed()
+    else:
+        corpus, queries = load_jsonl(args.corpus), load_jsonl(args.queries)
+        upstream = None
+        if args.online:
+            from src.mistral import MistralEmbed
+
+            upstream = MistralEmbed()
+        embedder = CachedEmbed(args.embeddings, embedder=upstream)
+
+    text_ids = {}
+    for chunk in corpus:
+        text_ids.setdefault(chunk["text"], []).append(chunk["id"])
+    store = InMemoryVectorStore(embedding=embedder)
+    store.add_texts(
+        texts=[chunk["text"] for chunk in corpus],
+        metadatas=[{"id": chunk["id"]} for chunk in corpus],
+    )
+    # Embed every query up front so that misses are reported before the sweep.
+    embedder.embed_documents([query["question"] for query in queries])
+    if isinstance(embedder, CachedEmbed):
+        embedder.save()
+
+    ks = [int(k) for k in args.k.split(",")] if args.k else None
+    results = []
+    failed_rerankers = set()
+    for cfg, final_k in sweep_configs(
+        args.config_dir,
+        ks,
+        retrievers=args.retrievers.split(",") if args.retrievers else None,
+        rerankers=args.rerankers.split(",") if args.rerankers else None,
+        diversities=args.diversity.split(",") if args.diversity else None,
+    ):
+        reranker = cfg.reranker.name if "reranker" in cfg else None
+        if reranker in failed_rerankers:
+            continue
+        try:
+            results.append(evaluate_config(cfg, final_k, store, queries, text_ids))
+        except Exception as e:
+            logger.warning(f"Skipping {OmegaConf.to_container(cfg)}: {e}")
+            if reranker is not None:
+                failed_rerankers.add(reranker)
+
+    print_results(results)
+    best = None
+    if args.target is not None:
+        best = cheapest(results, args.target_metric, args.target, args.cost)
+        if best is None:
+            print(f"\nNo configuration reaches {args.target_metric}@k >= {args.target}")
+        else:
+            print(
+                f"\nCheapest by {args.cost} with {args.target_metric}@k >= {args.target}: "
+                f"retriever={best['retriever']} fetch_k={best['fetch_k']} "
+                f"diversity={best['diversity']} "
+                f"reranker={best['reranker']} k={best['k']}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"queries": len(queries), "chunks": len(corpus),
+                       "results": results, "best": best}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Offline end-to-end benchmark for ingestion and chat.
+
+Usage:
+    python -m benchmarks.run --sizes 10,50,200 --chat-latency-ms 300
+
+Every corpus size runs in a fresh subprocess so that peak RSS is measured
+per size. Results are written as JSON (see ``benchmarks/compare.py``).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from .corpus import StaticSite, build_docs_site, build_pdf
+from .fake_openai import FakeOpenAIServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_CONFIG_DIR = os.path.join(ROOT, "benchmarks", "config")
+QUESTIONS = [
+    "How to configure routing?",
+    "How does dependency injection work?",
+    "How to deploy the application with docker?",
+    "What does the middleware return?",
+    "How to run background tasks?",
+    "How to test an endpoint?",
+]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def latency_summary(latencies):
+    return {
+        "count": len(latencies),
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else None,
+        "p50_ms": 1000 * percentile(latencies, 50) if latencies else None,
+        "p95_ms": 1000 * percentile(latencies, 95) if latencies else None,
+        "p99_ms": 1000 * percentile(latencies, 99) if latencies else None,
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def load_benchmark_config(config_name: str):
+    # Benchmark configs (no crawl delay or page cap, no LLM rate limit) live in
+    # benchmarks/config so the API cannot be asked to use them.
+    from src.config import load_config
+
+    if os.path.exists(os.path.join(BENCHMARK_CONFIG_DIR, f"{config_name}.yaml")):
+        return load_config(config_name, config_dir=BENCHMARK_CONFIG_DIR)
+    return load_config(config_name)
+
+
+def run_size(n_pages: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        return _run_size(n_pages, args, tmp)
+
+
+def _run_size(n_pages: int, args, tmp: str) -> dict:
+    fake = FakeOpenAIServer(
+        chat_latency=args.chat_latency_ms / 1000,
+        embed_latency=args.embed_latency_ms / 1000,
+    ).start()
+    # Must be set before src is imported: the clients and config read them from env.
+    os.environ["MISTRAL_API_URL"] = fake.base_url
+    os.environ["MISTRAL_API_KEY"] = "benchmark"
+    os.environ["RAG_SESSION_DB"] = os.path.join(tmp, "sessions.db")
+    os.environ["RAG_CRAWL_CACHE"] = os.path.join(tmp, "crawl_cache.db")
+
+    from src.pipeline import RAGPipeline
+
+    load_benchmark_config(args.config)
+    pipeline = RAGPipeline(config_name=args.config)
+    result = {"corpus_pages": n_pages}
+
+    site_pages = build_docs_site(os.path.join(tmp, "site"), n_pages)
+    with StaticSite(os.path.join(tmp, "site")) as site:
+        start = time.perf_counter()
+        url_store = pipeline.index_document("benchmark", site.url, "url")
+        elapsed = time.perf_counter() - start
+        first_crawl = site.stats
+
+        # Same site again: with the crawl cache every page should come back 304.
+        start = time.perf_counter()
+        pipeline.index_document("benchmark-recrawl", site.url, "url")
+        recrawl_elapsed = time.perf_counter() - start
+        recrawl = {
+            status: count - first_crawl.get(status, 0)
+            for status, count in site.stats.items()
+        }
+    # Rates are based on the pages the crawler actually fetched, which is less
+    # than the generated site when crawl.max_pages is set.
+    crawled_pages = first_crawl.get("200", 0)
+    chunks = len(url_store.store)
+    result["url_ingest"] = {
+        "pages": crawled_pages,
+        "site_pages": site_pages,
+        "chunks": chunks,
+        "seconds": elapsed,
+        "pages_per_sec": crawled_pages / elapsed,
+        "chunks_per_sec": chunks / elapsed,
+        "responses": first_crawl,
+    }
+    result["url_recrawl"] = {
+        "seconds": recrawl_elapsed,
+        "pages_per_sec": crawled_pages / recrawl_elapsed,
+        "responses": {status: count for status, count in recrawl.items() if count},
+    }
+
+    pdf_path = os.path.join(tmp, "docs.pdf")
+    pdf_pages = build_pdf(pdf_path, n_pages)
+    start = time.perf_counter()
+    pdf_store = pipeline.index_document("benchmark-pdf", pdf_path, "pdf")
+    elapsed = time.perf_counter() - start
+    chunks = len(pdf_store.store)
+    result["pdf_ingest"] = {
+        "pages": pdf_pages,
+        "chunks": chunks,
+        "seconds": elapsed,
+        "pages_per_sec": pdf_pages / elapsed,
+        "chunks_per_sec": chunks / elapsed,
+    }
+
+    chat_history = ""
+    latencies = []
+    for i in range(args.warmup + args.chat_queries):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        answer = pipeline.invoke(
+            question=question, chat_history=chat_history, session_id="benchmark"
+        )["answer"]
+        elapsed = time.perf_counter() - start
+        if i >= args.warmup:
+            latencies.append(elapsed)
+        if args.with_history:
+            chat_history += f"\n human: {question} \n assistant: {answer}"
+    result["chat"] = latency_summary(latencies)
+
+    if args.batch_size:
+        questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.batch_size)]
+        calls_before = fake.stats
+        start = time.perf_counter()
+        answered = sum(
+            "answer" in item for _, item in pipeline.invoke_batch(questions, "benchmark")
+        )
+        elapsed = time.perf_counter() - start
+        result["chat_batch"] = {
+            "questions": len(questions),
+            "answered": answered,
+            "seconds": elapsed,
+            "questions_per_sec": len(questions) / elapsed,
+            "sequential_questions_per_sec": 1000 / result["chat"]["mean_ms"],
+            "embedding_requests": fake.stats["embedding_requests"]
+            - calls_before["embedding_requests"],
+        }
+
+    result["api_calls"] = fake.stats
+    result["peak_rss_mb"] = peak_rss_mb()
+    fake.stop()
+    return result
+
+
+def git_revision() -> dict:
+    def git(*cmd):
+        try:
+            return subprocess.run(
+                ["git", *cmd], cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def child_args(args, n_pages: int):
+    return [
+        sys.executable, "-m", "benchmarks.run",
+        "--single-size", str(n_pages),
+        "--chat-queries", str(args.chat_queries),
+        "--warmup", str(args.warmup),
+        "--chat-latency-ms", str(args.chat_latency_ms),
+        "--batch-size", str(args.batch_size),
+        "--embed-latency-ms", str(args.embed_latency_ms),
+        "--log-level", args.log_level,
+        "--config", args.config,
+    ] + (["--with-history"] if args.with_history else [])
+
+
+def print_summary(results):
+    header = (
+        f"{'pages':>6} {'url p/s':>9} {'url c/s':>9} {'pdf p/s':>9} {'pdf c/s':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8}"
+    )
+    print(header)
+    for r in results:
+        print(
+            f"{r['corpus_pages']:>6} "
+            f"{r['url_ingest']['pages_per_sec']:>9.1f} {r['url_ingest']['chunks_per_sec']:>9.1f} "
+            f"{r['pdf_ingest']['pages_per_sec']:>9.1f} {r['pdf_ingest']['chunks_per_sec']:>9.1f} "
+            f"{r['chat']['p50_ms']:>8.1f} {r['chat']['p95_ms']:>8.1f} "
+            f"{r['chat']['p99_ms']:>8.1f} {r['peak_rss_mb']:>8.1f}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,50,200",
+                        help="Comma-separated corpus sizes in pages")
+    parser.add_argument("--chat-queries", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0,
+                        help="Latency injected by the fake chat endpoint")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0,
+                        help="Latency injected by the fake embeddings endpoint")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="Questions sent through invoke_batch (0 to skip)")
+    parser.add_argument("--with-history", action="store_true",
+                        help="Accumulate chat history between questions")
+    parser.add_argument("--output", default=None,
+                        help="JSON output path (default: bench_results/<commit>.json)")
+    parser.add_argument("--config", default="benchmark",
+                        help="Pipeline config from benchmarks/config/ or config/ "
+                             "(must use an in_memory vectorstore)")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--single-size", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    if args.single_size is not None:
+        json.dump(run_size(args.single_size, args), sys.stdout)
+        return
+
+    results = []
+    for n_pages in [int(size) for size in args.sizes.split(",")]:
+        logger.info(f"Benchmarking corpus of {n_pages} pages")
+        proc = subprocess.run(
+            child_args(args, n_pages), cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise SystemExit(f"Benchmark for {n_pages} pages failed")
+        results.append(json.loads(proc.stdout))
+
+    revision = git_revision()
+    report = {
+        "schema": 1,
+        **revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "chat_queries": args.chat_queries,
+            "warmup": args.warmup,
+            "chat_latency_ms": args.chat_latency_ms,
+            "embed_latency_ms": args.embed_latency_ms,
+            "with_history": args.with_history,
+            "batch_size": args.batch_size,
+            "config": args.config,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        ROOT, "bench_results", f"{(revision['commit'] or 'unknown')[:12]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(results)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Cold-start cost of the API process with each component enabled.
+
+Usage:
+    python -m benchmarks.startup --config config --output startup.json
+
+For every scenario a fresh interpreter imports ``main`` (as uvicorn would)
+and then warms up one component, so import time, warm-up time and baseline
+RSS are reported per component. Only the standard library is imported here
+to keep the parent process out of the measurement.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPONENTS = ("llm", "embedder", "tokenizer", "reranker", "vectorstore", "processors")
+
+
+def _rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(config_name: str, component: str) -> dict:
+    start = time.perf_counter()
+    import main  # noqa: F401
+
+    import_seconds = time.perf_counter() - start
+    result = {
+        "component": component,
+        "import_seconds": import_seconds,
+        "import_rss_mb": _rss_mb(),
+        "modules": len(sys.modules),
+    }
+
+    from src.components import warm_up
+
+    components = {"none": [], "all": None}.get(component, [component])
+    start = time.perf_counter()
+    try:
+        if components != []:
+            warm_up(config_name, components)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["warmup_seconds"] = time.perf_counter() - start
+    result["rss_mb"] = _rss_mb()
+    result["heavy_modules_loaded"] = sorted(
+        name for name in ("torch", "transformers", "openai", "langchain_milvus",
+                          "pymilvus", "mistral_common")
+        if name in sys.modules
+    )
+    return result
+
+
+def measure_all(args, tmp: str) -> list:
+    env = dict(os.environ)
+    # Keep the child away from the network: dummy key for the clients and
+    # locally cached model weights only.
+    env.setdefault("MISTRAL_API_KEY", "startup-benchmark")
+    env.setdefault("HF_HUB_OFFLINE", "1")
+    # Children run in a scratch directory so app.log and the SQLite files that
+    # importing main creates stay out of the repository.
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    env["RAG_SESSION_DB"] = os.path.join(tmp, "sessions.db")
+    env["RAG_CRAWL_CACHE"] = os.path.join(tmp, "crawl_cache.db")
+    results = []
+    for component in args.components.split(","):
+        runs = []
+        for _ in range(args.repeat):
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup",
+                 "--config", args.config, "--single", component],
+                cwd=tmp, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                sys.stderr.write(proc.stderr)
+                raise SystemExit(f"Startup measurement for {component} failed")
+            runs.append(json.loads(proc.stdout))
+        results.append(min(runs, key=lambda r: r["import_seconds"]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config")
+    parser.add_argument("--components", default=",".join(("none",) + COMPONENTS + ("all",)),
+                        help="Comma-separated scenarios: none, all or component names")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per scenario; the fastest import is reported")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--single", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single is not None:
+        json.dump(measure(args.config, args.single), sys.stdout)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = measure_all(args, tmp)
+
+    print(f"{'component':<12} {'import s':>9} {'warmup s':>9} {'import MB':>10} {'total MB':>9}  loaded")
+    for r in results:
+        note = r.get("error", ",".join(r["heavy_modules_loaded"]))
+        print(
+            f"{r['component']:<12} {r['import_seconds']:>9.2f} {r['warmup_seconds']:>9.2f} "
+            f"{r['import_rss_mb']:>10.1f} {r['rss_mb']:>9.1f}  {note}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": args.config, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic_models import (
+    BatchQueryInput,
     QueryInput,
     QueryResponse,
     DocumentInput,
     ResetChatHistoryInput
 )
+from src.admission import AdmissionRejected, Coalescer, build_admission_controllers
+from src.components import warm_up
+from src.config import load_config
 from src.pipeline import RAGPipeline
-from src.pdf_processor import PDFProcessor
-from src.url_processor import URLProcessor
+from src.session_store import SessionBusyError
+import threading
 import uuid
 from loguru import logger
 
@@ -16,64 +26,213 @@ logger.add(
     "app.log", level="INFO", rotation="10 MB", retention="10 days", compression="zip"
 )
 
+pipeline = RAGPipeline()
+admission = build_admission_controllers(load_config(pipeline.config_name))
+coalescer = Coalescer()
+
+
+async def expire_sessions_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(pipeline.expire_sessions)
+        except Exception as e:
+            logger.error(f"Session expiry failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy components load on first use; RAG_WARMUP=all (or a comma-separated
+    # list such as "llm,reranker") loads them before serving traffic instead.
+    warmup = os.getenv("RAG_WARMUP", "").strip()
+    if warmup:
+        components = None if warmup == "all" else [c.strip() for c in warmup.split(",") if c.strip()]
+        warm_up(pipeline.config_name, components)
+    interval = load_config(pipeline.config_name).session_store.cleanup_interval
+    cleanup = asyncio.create_task(expire_sessions_periodically(interval))
+    yield
+    cleanup.cancel()
+
+
 app = FastAPI(
     title="RAG Pipeline API",
     description="API LLM-приложения для работы с документацией",
+    lifespan=lifespan,
 )
-users_chat_history = {}
 
-pipeline = RAGPipeline()
 
+def get_config_name(config_path: str) -> str:
+    try:
+        load_config(config_path)
+    except ValueError as e:
+        logger.error(f"Invalid config {config_path}: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    return config_path
 
-@app.post("/upload_url")
-async def upload_and_index_document(document_input: DocumentInput):
+
+def rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Retry-After": str(int(e.retry_after))},
+    )
+
+
+async def admit(endpoint: str, session_id: str, key, call, *args):
+    # Identical in-flight requests share one execution (and one admission slot);
+    # the blocking work itself runs in the thread pool.
+    async def run():
+        async with admission[endpoint].slot(session_id):
+            return await asyncio.to_thread(call, *args)
+
+    try:
+        return await coalescer.run((endpoint, session_id) + key, run)
+    except AdmissionRejected as e:
+        raise rejected(e)
+
+
+async def index_document(document_input: DocumentInput, source_type: str):
     session_id = document_input.session_id or str(uuid.uuid4())
-    logger.info(f"Processing upload URL for session ID: {session_id}")
-    processor = URLProcessor(collection_name="pdf_documents")
-    vector_store = processor.process_url(document_input.docs_url)
-    pipeline.document_stores[session_id] = vector_store
+    logger.info(f"Processing {source_type} upload for session ID: {session_id}")
+    config_name = get_config_name(document_input.config_path)
+    await admit(
+        "upload",
+        session_id,
+        (source_type, document_input.docs_url, config_name),
+        pipeline.index_document,
+        session_id,
+        document_input.docs_url,
+        source_type,
+        config_name,
+    )
     logger.info(f"Document indexed for session ID: {session_id}")
 
 
+@app.post("/upload_url")
+async def upload_and_index_document(document_input: DocumentInput):
+    await index_document(document_input, "url")
+
+
 @app.post("/upload_pdf")
-def upload_and_index_pdf(document_input: DocumentInput):
-    session_id = document_input.session_id or str(uuid.uuid4())
-    logger.info(f"Processing PDF upload for session ID: {session_id}")
-    processor = PDFProcessor(collection_name="pdf_documents")
-    vector_store = processor.process_pdf(document_input.docs_url)
-    pipeline.document_stores[session_id] = vector_store
-    logger.info(f"PDF document indexed for session ID: {session_id}")
+async def upload_and_index_pdf(document_input: DocumentInput):
+    await index_document(document_input, "pdf")
+
+
+def answer_question(session_id: str, question: str, config_name: str) -> str:
+    if pipeline.get_document_store(session_id) is None:
+        logger.error(f"No documents found for session ID: {session_id}")
+        raise HTTPException(
+            status_code=400,
+            detail="No documents found for this session. Please upload a document first.",
+        )
+
+    lock_timeout = load_config(config_name).session_store.lock_timeout
+    try:
+        with pipeline.sessions.lock(session_id, timeout=lock_timeout):
+            chat_history = pipeline.sessions.get_chat_history(session_id)
+            answer = pipeline.invoke(
+                question=question,
+                chat_history=chat_history,
+                session_id=session_id,
+                config_name=config_name,
+            )["answer"]
+            pipeline.sessions.append_chat_message(session_id, question, answer)
+    except SessionBusyError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=409, detail=str(e))
+    return answer
 
 
 @app.post("/chat", response_model=QueryResponse)
-def chat(query_input: QueryInput):
+async def chat(query_input: QueryInput):
     session_id = query_input.session_id or str(uuid.uuid4())
     logger.info(f"Session ID: {session_id}, User Query: {query_input.question}")
+    config_name = get_config_name(query_input.config_path)
 
-    if session_id not in pipeline.document_stores:
-        logger.error(f"No documents found for session ID: {session_id}")
+    # The document version is part of the key so that a question asked again
+    # after a re-upload is not answered from the previous document set.
+    session = await asyncio.to_thread(pipeline.sessions.get_session, session_id)
+    document_set = session["collection_name"] if session else None
+    answer = await admit(
+        "chat",
+        session_id,
+        (document_set, config_name, query_input.question),
+        answer_question,
+        session_id,
+        query_input.question,
+        config_name,
+    )
+    logger.info(f"Session ID: {session_id}, AI Response: {answer}")
+
+    return QueryResponse(answer=answer, session_id=session_id)
+
+
+@app.post("/chat_batch")
+async def chat_batch(batch_input: BatchQueryInput):
+    session_id = batch_input.session_id
+    questions = batch_input.questions
+    config_name = get_config_name(batch_input.config_path)
+    max_questions = load_config(config_name).batch.max_questions
+    if not questions or len(questions) > max_questions:
+        raise HTTPException(
+            status_code=400, detail=f"Expected 1 to {max_questions} questions."
+        )
+    if await asyncio.to_thread(pipeline.get_document_store, session_id) is None:
         raise HTTPException(
             status_code=400,
             detail="No documents found for this session. Please upload a document first.",
         )
+    logger.info(f"Session ID: {session_id}, batch of {len(questions)} questions")
 
-    chat_history = users_chat_history.setdefault(session_id, "")
-    answer = pipeline.invoke(
-        question=query_input.question, chat_history=chat_history, session_id=session_id
-    )["answer"]
-    users_chat_history[
-        session_id
-    ] += f"\n human: {query_input.question} \n assistant: {answer}"
-    logger.info(f"Session ID: {session_id}, AI Response: {answer}")
+    try:
+        await admission["batch"].acquire(session_id)
+    except AdmissionRejected as e:
+        raise rejected(e)
 
-    return QueryResponse(answer=answer, session_id=session_id)
+    # Answers are streamed as NDJSON lines in completion order; the batch runs
+    # in a worker thread and hands results over through the queue.
+    loop = asyncio.get_running_loop()
+    results = asyncio.Queue()
+    stopped = threading.Event()
+
+    def produce():
+        batch = pipeline.invoke_batch(questions, session_id, config_name)
+        try:
+            for index, result in batch:
+                loop.call_soon_threadsafe(results.put_nowait, {"index": index, **result})
+                if stopped.is_set():
+                    break
+        except Exception as e:
+            logger.error(f"Batch for session {session_id} failed: {e}")
+            loop.call_soon_threadsafe(results.put_nowait, {"error": str(e)})
+        finally:
+            batch.close()
+
+    # The slot is held until the worker thread is done, not just the response:
+    # a client that disconnects only stops the batch at the next answer.
+    def finished(_):
+        admission["batch"].release(session_id)
+        results.put_nowait(None)
+
+    producer = asyncio.create_task(asyncio.to_thread(produce))
+    producer.add_done_callback(finished)
+
+    async def stream():
+        try:
+            while (item := await results.get()) is not None:
+                if "index" in item:
+                    item = {"index": item["index"], "question": questions[item["index"]], **item}
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        finally:
+            stopped.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 @app.post("/reset_chat_history", response_model=dict)
 def reset_chat_history(reset_input: ResetChatHistoryInput):
     session_id = reset_input.session_id
-    if session_id in users_chat_history:
-        del users_chat_history[session_id]
+    if pipeline.sessions.reset_chat_history(session_id):
         return {"message": "Chat history reset successfully."}
     else:
         raise HTTPException(status_code=404, detail="Session not found.")
@@ -95,8 +254,8 @@ if __name__ == "__main__":
     )
 
     logger.info("Starting document upload and indexing process.")
-    upload_and_index_document(document)
+    asyncio.run(upload_and_index_document(document))
     logger.info("Document upload completed. Proceeding with query.")
-    answer = chat(query)
+    answer = asyncio.run(chat(query))
     logger.info(f"Final answer: {answer.answer}")
     print(answer.answer)
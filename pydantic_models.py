@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel, Field
 
 
@@ -17,6 +19,12 @@ class QueryInput(BaseModel):
     config_path: str = Field(default="config")
 
 
+class BatchQueryInput(BaseModel):
+    questions: List[str]
+    session_id: str = Field(default=None)
+    config_path: str = Field(default="config")
+
+
 class QueryResponse(BaseModel):
     answer: str
     session_id: str
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from loguru import logger
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds how many requests of one kind run at once in this worker.
+
+    Requests over ``max_concurrency`` wait in per-session queues that are
+    served round-robin, so a session with many queued requests cannot starve
+    the others. A session with ``max_per_session`` requests already admitted
+    or waiting is rejected with 429; a full queue or a wait longer than
+    ``queue_timeout`` is rejected with 503.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        max_per_session: int,
+        queue_timeout: float,
+        retry_after: float = 1.0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._running = 0
+        self._queued = 0
+        self._waiters: "OrderedDict[str, deque]" = OrderedDict()
+        self._sessions = Counter()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"running": self._running, "queued": self._queued}
+
+    def _reject(self, status_code: int, detail: str):
+        logger.warning(f"{self.name}: {detail} ({self.stats})")
+        raise AdmissionRejected(status_code, detail, self.retry_after)
+
+    def _dispatch(self):
+        while self._running < self.max_concurrency and self._waiters:
+            session_id, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(session_id)
+            else:
+                del self._waiters[session_id]
+            self._queued -= 1
+            self._running += 1
+            future.set_result(None)
+
+    def _forget(self, session_id: str, future: asyncio.Future):
+        waiters = self._waiters.get(session_id)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[session_id]
+
+    def _leave(self, session_id: str):
+        self._sessions[session_id] -= 1
+        if not self._sessions[session_id]:
+            del self._sessions[session_id]
+
+    async def acquire(self, session_id: str):
+        if self._sessions[session_id] >= self.max_per_session:
+            self._reject(429, f"Too many concurrent {self.name} requests for this session")
+        if self._running < self.max_concurrency and not self._waiters:
+            self._sessions[session_id] += 1
+            self._running += 1
+            return
+        if self._queued >= self.max_queue:
+            self._reject(503, f"Too many {self.name} requests queued")
+
+        # A queued request counts against its session from now on.
+        self._sessions[session_id] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(session_id, deque()).append(future)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._forget(session_id, future)
+                self._leave(session_id)
+                self._reject(503, f"Timed out waiting for a {self.name} slot")
+        except BaseException:
+            # Cancelled by the client: give back a slot granted in the meantime.
+            if future.done():
+                self.release(session_id)
+            else:
+                self._forget(session_id, future)
+                self._leave(session_id)
+            raise
+
+    def release(self, session_id: str):
+        self._leave(session_id)
+        self._running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, session_id: str):
+        await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release(session_id)
+
+
+class Coalescer:
+    """Runs identical in-flight calls once and hands the result to every caller.
+
+    The shared execution is shielded, so a caller that disconnects does not
+    cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight request {key}")
+        return await asyncio.shield(task)
+
+
+class RateLimiter:
+    """Spaces calls from any number of threads at least 1 / rate seconds apart."""
+
+    def __init__(self, requests_per_second: Optional[float] = None):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def build_admission_controllers(cfg) -> Dict[str, AdmissionController]:
+    return {
+        name: AdmissionController(
+            name,
+            max_concurrency=limits.max_concurrency,
+            max_queue=limits.max_queue,
+            max_per_session=limits.max_per_session,
+            queue_timeout=limits.queue_timeout,
+            retry_after=cfg.admission.retry_after,
+        )
+        for name, limits in cfg.admission.endpoints.items()
+    }
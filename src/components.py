@@ -0,0 +1,218 @@
+import hashlib
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.vectorstores import InMemoryVectorStore
+from loguru import logger
+
+from .config import load_config
+from .mistral import MistralEmbed, MistralLLM, get_client
+from .utils import get_tokenizer_embed
+
+WARMUP_COMPONENTS = ("llm", "embedder", "tokenizer", "reranker", "vectorstore", "processors")
+
+_components = {}
+_lock = threading.Lock()
+
+# In-memory stores exist only in the worker that built them; Milvus stores are
+# just client wrappers, so a bounded number of them is kept open per worker.
+_local_stores = {}
+_opened_stores = OrderedDict()
+MAX_OPENED_STORES = 256
+
+
+def _get_or_build(kind: str, config_name: str, build):
+    key = (kind, config_name)
+    component = _components.get(key)
+    if component is None:
+        with _lock:
+            component = _components.get(key)
+            if component is None:
+                logger.info(f"Building {kind} for config '{config_name}'")
+                component = build(load_config(config_name))
+                _components[key] = component
+    return component
+
+
+def get_llm(config_name: str = "config") -> MistralLLM:
+    return _get_or_build(
+        "llm",
+        config_name,
+        lambda cfg: MistralLLM(
+            api_key=os.getenv(cfg.llm.env_api_key),
+            model_name=cfg.llm.model_name,
+            api_url=cfg.llm.api_url,
+        ),
+    )
+
+
+def get_llm_rate_limiter(config_name: str = "config"):
+    # Shared by every batch in this worker, so concurrent batches split the rate.
+    from .admission import RateLimiter
+
+    return _get_or_build(
+        "llm_rate_limiter",
+        config_name,
+        lambda cfg: RateLimiter(cfg.batch.llm_requests_per_second),
+    )
+
+
+def get_embedder(config_name: str = "config") -> MistralEmbed:
+    return _get_or_build(
+        "embedder",
+        config_name,
+        lambda cfg: MistralEmbed(
+            api_key=os.getenv(cfg.embedder.env_api_key),
+            model_name=cfg.embedder.model_name,
+            api_url=cfg.embedder.api_url,
+        ),
+    )
+
+
+def get_crawl_cache(config_name: str = "config"):
+    cfg = load_config(config_name)
+    if not cfg.crawl.get("cache_path"):
+        return None
+
+    def build(cfg):
+        from .crawl_cache import CrawlCache
+
+        return CrawlCache(cfg.crawl.cache_path)
+
+    return _get_or_build("crawl_cache", config_name, build)
+
+
+def session_collection_name(config_name: str, session_id: str, version: int) -> str:
+    cfg = load_config(config_name)
+    digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:16]
+    return f"{cfg.vectorstore.collection_name}_{digest}_v{version}"
+
+
+def register_vector_store(config_name: str, collection_name: str, store):
+    key = (config_name, collection_name)
+    with _lock:
+        if load_config(config_name).vectorstore.name == "milvus":
+            _opened_stores[key] = store
+            while len(_opened_stores) > MAX_OPENED_STORES:
+                _opened_stores.popitem(last=False)
+        else:
+            _local_stores[key] = store
+
+
+def open_vector_store(config_name: str, collection_name: str):
+    key = (config_name, collection_name)
+    with _lock:
+        store = _local_stores.get(key) or _opened_stores.get(key)
+        if store is not None:
+            if key in _opened_stores:
+                _opened_stores.move_to_end(key)
+            return store
+
+    cfg = load_config(config_name)
+    if cfg.vectorstore.name != "milvus":
+        logger.warning(f"Collection {collection_name} is not available in this worker")
+        return None
+
+    from langchain_milvus import Milvus
+
+    store = Milvus(
+        embedding_function=get_embedder(config_name),
+        collection_name=collection_name,
+        connection_args={"uri": cfg.vectorstore.uri},
+        auto_id=True,
+    )
+    register_vector_store(config_name, collection_name, store)
+    return store
+
+
+def drop_vector_store(config_name: str, collection_name: str):
+    key = (config_name, collection_name)
+    with _lock:
+        _local_stores.pop(key, None)
+        _opened_stores.pop(key, None)
+
+    cfg = load_config(config_name)
+    if cfg.vectorstore.name == "milvus":
+        from pymilvus import connections, utility
+
+        connections.connect(alias="default", uri=cfg.vectorstore.uri, secure=False)
+        if utility.has_collection(collection_name):
+            utility.drop_collection(collection_name)
+    logger.info(f"Dropped collection {collection_name}")
+
+
+def _processor_kwargs(config_name: str, collection_name: Optional[str] = None) -> dict:
+    cfg = load_config(config_name)
+    embedder = get_embedder(config_name)
+    kwargs = {
+        "collection_name": collection_name or cfg.vectorstore.collection_name,
+        "embed_model": embedder,
+        "chunk_size": cfg.chunk_size,
+        "chunk_overlap": cfg.chunk_overlap,
+    }
+    if cfg.vectorstore.name == "milvus":
+        kwargs["uri_connection"] = cfg.vectorstore.uri
+    else:
+        kwargs["vector_store"] = InMemoryVectorStore(embedding=embedder)
+    return kwargs
+
+
+def build_url_processor(
+    config_name: str = "config", collection_name: Optional[str] = None
+):
+    from .url_processor import URLProcessor
+
+    cfg = load_config(config_name)
+    return URLProcessor(
+        max_depth=cfg.crawl.max_depth,
+        crawl_delay=cfg.crawl.delay,
+        max_pages=cfg.crawl.get("max_pages"),
+        use_sitemap=cfg.crawl.get("use_sitemap", True),
+        crawl_cache=get_crawl_cache(config_name),
+        **_processor_kwargs(config_name, collection_name),
+    )
+
+
+def build_pdf_processor(
+    config_name: str = "config", collection_name: Optional[str] = None
+):
+    from .pdf_processor import PDFProcessor
+
+    return PDFProcessor(**_processor_kwargs(config_name, collection_name))
+
+
+def warm_up(
+    config_name: str = "config", components: Optional[List[str]] = None
+) -> Dict[str, float]:
+    cfg = load_config(config_name)
+    timings = {}
+    for component in components or WARMUP_COMPONENTS:
+        start = time.perf_counter()
+        if component == "llm":
+            llm = get_llm(config_name)
+            get_client(llm.api_key, llm.api_url)
+        elif component == "embedder":
+            embedder = get_embedder(config_name)
+            get_client(embedder.api_key, embedder.api_url)
+        elif component == "tokenizer":
+            get_tokenizer_embed()
+        elif component == "reranker":
+            if cfg.reranker.name == "cross_encoder":
+                from .reranker import load_cross_encoder
+
+                load_cross_encoder(cfg.reranker.cross_encoder.model_name)
+        elif component == "vectorstore":
+            if cfg.vectorstore.name == "milvus":
+                importlib.import_module("langchain_milvus")
+        elif component == "processors":
+            importlib.import_module(".url_processor", __package__)
+            importlib.import_module(".pdf_processor", __package__)
+        else:
+            raise ValueError(f"Unknown component to warm up: {component}")
+        timings[component] = time.perf_counter() - start
+        logger.info(f"Warmed up {component} for config '{config_name}' in {timings[component]:.2f}s")
+    return timings
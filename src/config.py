@@ -0,0 +1,130 @@
+import os
+import re
+import threading
+from typing import List
+
+from dotenv import load_dotenv
+from hydra import compose, initialize_config_dir
+from hydra.errors import HydraException
+from omegaconf import DictConfig, OmegaConf
+from loguru import logger
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+
+RETRIEVERS = ("vectorstore", "bm25", "ensemble")
+RERANKERS = ("bm25", "cross_encoder")
+DIVERSIFIERS = ("none", "mmr")
+VECTORSTORES = ("milvus", "in_memory")
+SESSION_STORES = ("sqlite",)
+
+load_dotenv()
+
+_configs = {}
+_lock = threading.Lock()
+
+
+def available_configs() -> List[str]:
+    return sorted(
+        name[: -len(".yaml")]
+        for name in os.listdir(CONFIG_DIR)
+        if name.endswith(".yaml")
+    )
+
+
+def validate_config(cfg: DictConfig, config_name: str):
+    def require(condition, message):
+        if not condition:
+            raise ValueError(f"Invalid config '{config_name}': {message}")
+
+    for section in (
+        "llm", "embedder", "vectorstore", "retriever", "diversity", "reranker",
+        "session_store", "admission",
+    ):
+        require(section in cfg, f"missing section '{section}'")
+
+    require(cfg.chunk_size > 0, "chunk_size must be positive")
+    require(
+        0 <= cfg.chunk_overlap < cfg.chunk_size,
+        "chunk_overlap must be between 0 and chunk_size",
+    )
+    require(cfg.vectorstore.name in VECTORSTORES, f"unknown vectorstore '{cfg.vectorstore.name}'")
+
+    retriever = cfg.retriever.name
+    require(retriever in RETRIEVERS, f"unknown retriever '{retriever}'")
+    require(cfg.retriever.get(retriever, {}).get("k", 4) > 0, "retriever k must be positive")
+    if retriever == "ensemble":
+        for member in cfg.retriever.ensemble.retrievers:
+            require(
+                member.name in RETRIEVERS and member.name != "ensemble",
+                f"unknown ensemble member '{member.name}'",
+            )
+
+    diversity = cfg.diversity.name
+    require(diversity in DIVERSIFIERS, f"unknown diversity '{diversity}'")
+    if diversity == "mmr":
+        mmr = cfg.diversity.mmr
+        require(0 < mmr.k <= mmr.fetch_k, "diversity.mmr.k must be between 1 and fetch_k")
+        require(0 <= mmr.lambda_mult <= 1, "diversity.mmr.lambda_mult must be between 0 and 1")
+
+    reranker = cfg.reranker.name
+    require(reranker in RERANKERS, f"unknown reranker '{reranker}'")
+    require(cfg.reranker.get(reranker, {}).get("k", 4) > 0, "reranker k must be positive")
+
+    crawl = cfg.crawl
+    require(crawl.max_depth >= 0, "crawl.max_depth must not be negative")
+    require(crawl.delay >= 0, "crawl.delay must not be negative")
+    require(
+        crawl.get("max_pages") is None or crawl.max_pages > 0,
+        "crawl.max_pages must be positive",
+    )
+
+    batch = cfg.batch
+    require(batch.max_questions > 0, "batch.max_questions must be positive")
+    require(batch.llm_concurrency > 0, "batch.llm_concurrency must be positive")
+    require(
+        batch.get("llm_requests_per_second") is None or batch.llm_requests_per_second > 0,
+        "batch.llm_requests_per_second must be positive",
+    )
+
+    session_store = cfg.session_store
+    require(
+        session_store.backend in SESSION_STORES,
+        f"unknown session store backend '{session_store.backend}'",
+    )
+    require(session_store.ttl_seconds > 0, "session_store.ttl_seconds must be positive")
+    require(session_store.lock_lease > 0, "session_store.lock_lease must be positive")
+
+    for endpoint, limits in cfg.admission.endpoints.items():
+        for key in ("max_concurrency", "max_per_session", "queue_timeout"):
+            require(limits[key] > 0, f"admission.endpoints.{endpoint}.{key} must be positive")
+        require(limits.max_queue >= 0, f"admission.endpoints.{endpoint}.max_queue must not be negative")
+
+    # Resolve interpolations such as ${oc.env:...} now rather than on first request.
+    OmegaConf.to_container(cfg, resolve=True)
+
+
+def load_config(config_name: str = "config", config_dir: str = CONFIG_DIR) -> DictConfig:
+    # API clients can only name configs from config/. Tools keep their own
+    # configs elsewhere (benchmarks/config) and compose them on top of config/;
+    # once loaded, such a config is served from the cache under its name.
+    cfg = _configs.get(config_name)
+    if cfg is not None:
+        return cfg
+
+    if not re.fullmatch(r"[\w-]+", config_name or ""):
+        raise ValueError(f"Invalid config name: {config_name!r}")
+
+    with _lock:
+        cfg = _configs.get(config_name)
+        if cfg is None:
+            try:
+                overrides = [] if config_dir == CONFIG_DIR else [f"hydra.searchpath=[file://{CONFIG_DIR}]"]
+                with initialize_config_dir(config_dir=config_dir, version_base=None):
+                    cfg = compose(config_name=config_name, overrides=overrides)
+            except HydraException as e:
+                raise ValueError(f"Unknown config '{config_name}'") from e
+            validate_config(cfg, config_name)
+            OmegaConf.set_readonly(cfg, True)
+            _configs[config_name] = cfg
+            logger.info(f"Loaded config '{config_name}'")
+    return cfg
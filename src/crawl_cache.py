@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from loguru import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    final_url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class CrawlCache:
+    """Persistent copy of crawled pages with their HTTP validators.
+
+    Bodies are stored zlib-compressed; ``final_url`` is where the request
+    ended up after redirects and ``fetched_at`` is the last time the server
+    confirmed the copy (a 200 or a 304 response).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+        logger.info(f"Using crawl cache: {path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT * FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["body"] = zlib.decompress(entry["body"])
+        return entry
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        content_type: Optional[str] = None,
+        final_url: Optional[str] = None,
+    ):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO pages "
+            "(url, final_url, etag, last_modified, content_type, body, size, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, final_url or url, etag, last_modified, content_type,
+             zlib.compress(body), len(body), time.time()),
+        )
+
+    def touch(self, url: str):
+        self._connection().execute(
+            "UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url)
+        )
@@ -0,0 +1,181 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain.schema import Document
+from loguru import logger
+
+from .retriever import (
+    component_spec,
+    retrieve_chunks,
+    retrieve_chunks_batch,
+    store_vectors,
+    unit_rows,
+)
+
+
+def maximal_marginal_relevance_batch(
+    relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = 0.5
+) -> np.ndarray:
+    """Indices of ``k`` candidates picked greedily by MMR, for every query.
+
+    ``relevance`` has shape (queries, candidates) and ``vectors`` shape
+    (queries, candidates, dim). Candidate similarities come from one batched
+    matrix product, and the similarity of every candidate to the selected set
+    is kept as a running maximum, so each pick is a single vectorized update
+    over all queries and candidates.
+    """
+    relevance = lambda_mult * np.asarray(relevance, dtype=np.float32)
+    batch, n = relevance.shape
+    k = min(k, n)
+    selected = np.empty((batch, max(k, 0)), dtype=np.intp)
+    if k <= 0:
+        return selected
+    unit = unit_rows(np.asarray(vectors, dtype=np.float32))
+    similarity = unit @ unit.transpose(0, 2, 1)
+    rows = np.arange(batch)
+
+    selected[:, 0] = relevance.argmax(axis=1)
+    max_similarity = similarity[rows, selected[:, 0]].copy()
+    available = np.ones((batch, n), dtype=bool)
+    available[rows, selected[:, 0]] = False
+    for step in range(1, k):
+        scores = relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = scores.argmax(axis=1)
+        selected[:, step] = best
+        available[rows, best] = False
+        np.maximum(max_similarity, similarity[rows, best], out=max_similarity)
+    return selected
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = 0.5
+) -> List[int]:
+    if len(relevance) == 0:
+        return []
+    selected = maximal_marginal_relevance_batch(
+        np.asarray(relevance)[None], np.asarray(vectors)[None], k, lambda_mult
+    )
+    return selected[0].tolist()
+
+
+def uses_query_vector(cfg) -> bool:
+    retriever, params = component_spec(cfg, "retriever")
+    if retriever == "ensemble":
+        return any(member["name"] == "vectorstore" for member in params["retrievers"])
+    return retriever == "vectorstore"
+
+
+def ranks_by_similarity(cfg) -> bool:
+    # Only plain vector search ranks candidates by query cosine. BM25 scores and
+    # the weighted RRF of an ensemble are only reflected in the candidate order.
+    return component_spec(cfg, "retriever")[0] == "vectorstore"
+
+
+def _relevance(vectors: np.ndarray, query_vectors: Optional[np.ndarray], n: int) -> np.ndarray:
+    if query_vectors is not None:
+        return np.einsum("...nd,...d->...n", unit_rows(vectors), unit_rows(query_vectors))
+    # Without a query vector, relevance follows the retriever's order.
+    return 1.0 - np.arange(n, dtype=np.float32) / n
+
+
+def diversify_chunks(
+    documents: Sequence[Document],
+    store,
+    k: int = 4,
+    lambda_mult: float = 0.5,
+    query_vector: Optional[Sequence[float]] = None,
+) -> List[Document]:
+    if len(documents) <= k:
+        return list(documents)
+    vectors = store_vectors(store, documents)
+    if vectors is None:
+        logger.warning("Stored vectors are unavailable, skipping MMR")
+        return list(documents[:k])
+
+    if query_vector is not None:
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+    relevance = _relevance(vectors, query_vector, len(documents))
+    selected = maximal_marginal_relevance(relevance, vectors, k, lambda_mult)
+    return [documents[i] for i in selected]
+
+
+def diversify_chunks_batch(
+    candidates: Sequence[Sequence[Document]],
+    store,
+    k: int = 4,
+    lambda_mult: float = 0.5,
+    query_vectors=None,
+) -> List[List[Document]]:
+    sizes = {len(documents) for documents in candidates}
+    if len(sizes) != 1 or sizes.pop() <= k:
+        # Ragged candidate lists (tiny stores, ensemble dedup) go one by one.
+        return [
+            diversify_chunks(
+                documents,
+                store,
+                k=k,
+                lambda_mult=lambda_mult,
+                query_vector=None if query_vectors is None else query_vectors[i],
+            )
+            for i, documents in enumerate(candidates)
+        ]
+
+    flat = [doc for documents in candidates for doc in documents]
+    vectors = store_vectors(store, flat)
+    if vectors is None:
+        logger.warning("Stored vectors are unavailable, skipping MMR")
+        return [list(documents[:k]) for documents in candidates]
+
+    n = len(candidates[0])
+    vectors = vectors.reshape(len(candidates), n, -1)
+    if query_vectors is not None:
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+    relevance = np.broadcast_to(_relevance(vectors, query_vectors, n), (len(candidates), n))
+    selected = maximal_marginal_relevance_batch(relevance, vectors, k, lambda_mult)
+    return [[documents[i] for i in row] for documents, row in zip(candidates, selected)]
+
+
+def retrieve_diverse_chunks(cfg, query: str, store) -> List[Document]:
+    diversity, params = component_spec(cfg, "diversity") if "diversity" in cfg else ("none", {})
+    if diversity == "none":
+        return retrieve_chunks(cfg, query, store)
+    if diversity != "mmr":
+        raise ValueError(f"Unknown diversity type: {diversity}")
+
+    # The query is embedded once here and reused by the vector search and MMR.
+    query_vector = store.embeddings.embed_query(query) if uses_query_vector(cfg) else None
+    candidates = retrieve_chunks(
+        cfg, query, store, k=params.get("fetch_k", 20), query_vector=query_vector
+    )
+    return diversify_chunks(
+        candidates,
+        store,
+        k=params.get("k", 4),
+        lambda_mult=params.get("lambda_mult", 0.5),
+        query_vector=query_vector if ranks_by_similarity(cfg) else None,
+    )
+
+
+def retrieve_diverse_chunks_batch(cfg, queries: Sequence[str], store) -> List[List[Document]]:
+    diversity, params = component_spec(cfg, "diversity") if "diversity" in cfg else ("none", {})
+    if diversity not in ("none", "mmr"):
+        raise ValueError(f"Unknown diversity type: {diversity}")
+
+    # All queries are embedded in a single request.
+    query_vectors = None
+    if uses_query_vector(cfg):
+        query_vectors = np.asarray(store.embeddings.embed_documents(list(queries)), dtype=np.float32)
+    if diversity == "none":
+        return retrieve_chunks_batch(cfg, queries, store, query_vectors=query_vectors)
+
+    candidates = retrieve_chunks_batch(
+        cfg, queries, store, k=params.get("fetch_k", 20), query_vectors=query_vectors
+    )
+    return diversify_chunks_batch(
+        candidates,
+        store,
+        k=params.get("k", 4),
+        lambda_mult=params.get("lambda_mult", 0.5),
+        query_vectors=query_vectors if ranks_by_similarity(cfg) else None,
+    )
@@ -1,13 +1,22 @@
+from functools import lru_cache
 from typing import List, Optional, Union
 from langchain.llms.base import LLM
 from loguru import logger
-import openai
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
 
+@lru_cache(maxsize=None)
+def get_client(api_key: Optional[str], api_url: Optional[str]):
+    # One client per endpoint keeps the HTTP connection pool warm between calls;
+    # openai itself is imported on first use to keep startup light.
+    import openai
+
+    return openai.Client(api_key=api_key, base_url=api_url)
+
+
 class MistralLLM(LLM):
     api_key: str = os.getenv("MISTRAL_API_KEY")
     model_name: str = 'mistral-large-2411'
@@ -25,7 +34,7 @@ class MistralLLM(LLM):
         max_tokens: int = 1024,
         **kwargs
     ) -> str:
-        client = openai.Client(api_key=self.api_key, base_url=self.api_url)
+        client = get_client(self.api_key, self.api_url)
         payload = {
             "model": self.model_name,
             "messages": [
@@ -53,12 +62,25 @@ class MistralEmbed:
     model_name: str = 'mistral-embed'
     api_url: str = os.getenv("MISTRAL_API_URL")
 
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        api_url: Optional[str] = None,
+    ):
+        if api_key is not None:
+            self.api_key = api_key
+        if model_name is not None:
+            self.model_name = model_name
+        if api_url is not None:
+            self.api_url = api_url
+
     @property
     def _model_type(self) -> str:
         return "mistral-embed"
 
     def _call(self, texts: List[str], **kwargs) -> List[List[float]]:
-        client = openai.Client(api_key=self.api_key, base_url=self.api_url)
+        client = get_client(self.api_key, self.api_url)
         payload = {"model": self.model_name, "input": texts, **kwargs}
         # logger.debug("Request Payload: {}", payload)
         try:
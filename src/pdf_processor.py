@@ -1,8 +1,6 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_milvus import Milvus
-from pymilvus import connections, utility
 from loguru import logger
 
 from .mistral import MistralEmbed
@@ -10,14 +8,28 @@ from .mistral import MistralEmbed
 
 class PDFProcessor:
     def __init__(
-        self, collection_name: str, uri_connection: str = "http://localhost:19530"
+        self,
+        collection_name: str,
+        uri_connection: str = "http://localhost:19530",
+        vector_store=None,
+        embed_model: Optional[MistralEmbed] = None,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
     ):
         self.collection_name = collection_name
         self.uri_connection = uri_connection
-        self._embed_model: MistralEmbed = MistralEmbed()
-        self.vector_store = self.init_vectorstore_collection()
+        self._embed_model: MistralEmbed = embed_model or MistralEmbed()
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+        if vector_store is None:
+            vector_store = self.init_vectorstore_collection()
+        self.vector_store = vector_store
 
     def init_vectorstore_collection(self):
+        from langchain_milvus import Milvus
+        from pymilvus import connections, utility
+
         connections.connect(alias="default", uri=self.uri_connection, secure=False)
 
         if utility.has_collection(self.collection_name):
@@ -39,14 +51,8 @@ class PDFProcessor:
         logger.info(f"Loaded {len(documents)} pages from PDF.")
         return documents
 
-    @staticmethod
-    def split_text(
-        content: str, chunk_size: int = 512, chunk_overlap: int = 50
-    ) -> List[str]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap
-        )
-        return splitter.split_text(content)
+    def split_text(self, content: str) -> List[str]:
+        return self._splitter.split_text(content)
 
     def process_pdf(self, file_path: str):
         documents = self.load_pdf(file_path)
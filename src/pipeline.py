@@ -1,45 +1,29 @@
-import os
 import logging
 
 from dotenv import load_dotenv
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain_core.prompts import PromptTemplate
 
-from .mistral import MistralLLM
-from .retriever import retrieve_chunks
-from .reranker import rerank_chunks
+from loguru import logger
 
+from .components import (
+    build_pdf_processor,
+    build_url_processor,
+    drop_vector_store,
+    get_llm,
+    get_llm_rate_limiter,
+    open_vector_store,
+    register_vector_store,
+    session_collection_name,
+)
+from .config import available_configs, load_config
+from .diversity import retrieve_diverse_chunks, retrieve_diverse_chunks_batch
+from .reranker import rerank_chunks, rerank_chunks_batch
+from .session_store import SessionStore, build_session_store
 
-class RAGPipeline:
-    def __init__(self):
-        load_dotenv(".env")
-        MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 
-        self.llm = MistralLLM(
-            api_key=MISTRAL_API_KEY,
-            model_name="mistral-large-latest",
-            api_url="https://api.mistral.ai/v1/",
-        )
-        self.document_stores = {}
-
-    def setup_qa_chain(self, question: str, chat_history: str, session_id: str):
-        logging.debug(f"Setting up QA chain for session {session_id}")
-        logging.debug(f"Available document stores: {list(self.document_stores.keys())}")
-
-        if session_id not in self.document_stores:
-            raise ValueError(f"No document store found for session {session_id}")
-
-        cfg = {"retriever": "vectorstore", "reranker": "bm25"}
-
-        retrieve_results = retrieve_chunks(
-            cfg, query=question, store=self.document_stores[session_id]
-        )
-
-        retrieve_texts = [doc.page_content for doc in retrieve_results]
-
-        rerank_results = rerank_chunks(cfg=cfg, query=question, chunks=retrieve_texts)
-
-        system_template = """You are an assistant dedicated to helping users with documentation.
+SYSTEM_TEMPLATE = """You are an assistant dedicated to helping users with documentation.
 
 Your task is to provide answers based on the information retrieved from search results. Follow these guidelines:
 
@@ -55,29 +39,168 @@ Your task is to provide answers based on the information retrieved from search r
 7. **Language Consistency**: Always respond in the same language in which the question LATER was asked, even if the documentation is in another language. Triple check this before the answer!
 
 By adhering to these principles, you ensure that users receive reliable and helpful responses."""
-        user_template = (
-            "Request: {input_text}\n"
-            "Search results for this request: {search_results}\n"
-            "Conversation history:\n{chat_history}"
-        )
+USER_TEMPLATE = (
+    "Request: {input_text}\n"
+    "Search results for this request: {search_results}\n"
+    "Conversation history:\n{chat_history}"
+)
+
+
+def build_prompts(question: str, search_results: List[str], chat_history: str) -> Tuple[str, str]:
+    system_prompt_template = PromptTemplate(input_variables=[], template=SYSTEM_TEMPLATE)
+    user_prompt_template = PromptTemplate(
+        input_variables=["input_text", "search_results", "chat_history"],
+        template=USER_TEMPLATE,
+    )
+    return system_prompt_template.format(), user_prompt_template.format(
+        input_text=question,
+        search_results="\n".join(search_results),
+        chat_history=chat_history,
+    )
 
-        system_prompt_template = PromptTemplate(
-            input_variables=[], template=system_template
-        )
-        user_prompt_template = PromptTemplate(
-            input_variables=["input_text", "search_results", "chat_history"],
-            template=user_template,
+
+class RAGPipeline:
+    def __init__(
+        self, config_name: str = "config", session_store: Optional[SessionStore] = None
+    ):
+        load_dotenv(".env")
+        # Fail at startup rather than on the first request that uses a broken config.
+        for name in available_configs():
+            load_config(name)
+        self.config_name = config_name
+        self.sessions = session_store or build_session_store(load_config(config_name))
+
+    def get_document_store(self, session_id: str):
+        session = self.sessions.get_session(session_id)
+        if session is None:
+            return None
+        return open_vector_store(session["config_name"], session["collection_name"])
+
+    def index_document(
+        self,
+        session_id: str,
+        source: str,
+        source_type: str,
+        config_name: Optional[str] = None,
+    ):
+        # Every upload is indexed into a fresh collection and only then swapped
+        # in, so other workers keep answering from the previous version meanwhile.
+        if source_type not in ("url", "pdf"):
+            raise ValueError(f"Unknown source type: {source_type}")
+
+        config_name = config_name or self.config_name
+        version = self.sessions.next_document_version(session_id)
+        collection_name = session_collection_name(config_name, session_id, version)
+
+        try:
+            if source_type == "url":
+                vector_store = build_url_processor(config_name, collection_name).process_url(source)
+            else:
+                vector_store = build_pdf_processor(config_name, collection_name).process_pdf(source)
+        except Exception:
+            # No session points at this collection yet, so nothing else would drop it.
+            try:
+                drop_vector_store(config_name, collection_name)
+            except Exception as e:
+                logger.error(f"Failed to drop collection {collection_name}: {e}")
+            raise
+
+        register_vector_store(config_name, collection_name, vector_store)
+        unused = self.sessions.set_document(session_id, collection_name, config_name, version)
+        if unused is not None:
+            drop_vector_store(*unused)
+        return vector_store
+
+    def expire_sessions(self):
+        for config_name, collection_name in self.sessions.expire():
+            try:
+                drop_vector_store(config_name, collection_name)
+            except Exception as e:
+                logger.error(f"Failed to drop collection {collection_name}: {e}")
+
+    def setup_qa_chain(
+        self,
+        question: str,
+        chat_history: str,
+        session_id: str,
+        config_name: Optional[str] = None,
+    ):
+        logging.debug(f"Setting up QA chain for session {session_id}")
+
+        document_store = self.get_document_store(session_id)
+        if document_store is None:
+            raise ValueError(f"No document store found for session {session_id}")
+
+        config_name = config_name or self.config_name
+        cfg = load_config(config_name)
+
+        retrieve_results = retrieve_diverse_chunks(
+            cfg, query=question, store=document_store
         )
 
-        formatted_system_prompt = system_prompt_template.format()
-        formatted_user_prompt = user_prompt_template.format(
-            input_text=question,
-            search_results="\n".join(rerank_results),
-            chat_history=chat_history,
+        retrieve_texts = [doc.page_content for doc in retrieve_results]
+
+        rerank_results = rerank_chunks(cfg=cfg, query=question, chunks=retrieve_texts)
+
+        formatted_system_prompt, formatted_user_prompt = build_prompts(
+            question, rerank_results, chat_history
         )
 
-        answer = self.llm.generate(formatted_system_prompt, formatted_user_prompt)
+        answer = get_llm(config_name).generate(
+            formatted_system_prompt, formatted_user_prompt
+        )
         return {"answer": answer}
 
-    def invoke(self, question: str, chat_history: str, session_id) -> Dict:
-        return self.setup_qa_chain(question, chat_history, session_id)
+    def invoke(
+        self,
+        question: str,
+        chat_history: str,
+        session_id,
+        config_name: Optional[str] = None,
+    ) -> Dict:
+        return self.setup_qa_chain(question, chat_history, session_id, config_name)
+
+    def invoke_batch(
+        self,
+        questions: List[str],
+        session_id: str,
+        config_name: Optional[str] = None,
+    ) -> Iterator[Tuple[int, Dict]]:
+        """Answer independent questions about one document set.
+
+        Queries are embedded in one request and searched and reranked as a
+        batch; LLM calls then run concurrently within the configured rate
+        limit. Yields (index, result) pairs in completion order. Questions do
+        not see or extend the session's chat history.
+        """
+        document_store = self.get_document_store(session_id)
+        if document_store is None:
+            raise ValueError(f"No document store found for session {session_id}")
+
+        config_name = config_name or self.config_name
+        cfg = load_config(config_name)
+        retrieved = retrieve_diverse_chunks_batch(cfg, questions, document_store)
+        reranked = rerank_chunks_batch(
+            cfg, questions, [[doc.page_content for doc in docs] for docs in retrieved]
+        )
+
+        llm = get_llm(config_name)
+        rate_limiter = get_llm_rate_limiter(config_name)
+
+        def answer(index: int) -> str:
+            system_prompt, user_prompt = build_prompts(questions[index], reranked[index], "")
+            rate_limiter.wait()
+            return llm.generate(system_prompt, user_prompt)
+
+        executor = ThreadPoolExecutor(max_workers=cfg.batch.llm_concurrency)
+        try:
+            futures = {executor.submit(answer, i): i for i in range(len(questions))}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], {"answer": future.result()}
+                except Exception as e:
+                    logger.error(f"Batch question {futures[future]} failed: {e}")
+                    yield futures[future], {"error": str(e)}
+        finally:
+            # Stop queued LLM calls when the consumer goes away early.
+            executor.shutdown(wait=False, cancel_futures=True)
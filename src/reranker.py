@@ -1,14 +1,16 @@
-import torch
-
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 from loguru import logger
 from rank_bm25 import BM25Okapi
 
+from .retriever import component_spec
 from .utils import tokenize_text
 
 
-def rerank_bm25(query: str, chunks: List[str]):
+def rerank_bm25(query: str, chunks: List[str], top_k: Optional[int] = None):
+    # BM25Okapi divides by the corpus size, so an empty retrieval has nothing to rank.
+    if not chunks:
+        return []
 
     tokenized_query = tokenize_text(query)
     logger.debug("Query prepared succesfully: {}", tokenized_query)
@@ -21,41 +23,82 @@ def rerank_bm25(query: str, chunks: List[str]):
 
     sorted_chunks_scores = sorted(zip(chunks, scores), key=lambda x: x[1], reverse=True)
     sorted_chunks = [chunk for chunk, _ in sorted_chunks_scores]
-    return sorted_chunks
+    return sorted_chunks[:top_k]
+
 
+@lru_cache(maxsize=None)
+def load_cross_encoder(model_name: str):
+    # torch and transformers cost seconds and hundreds of MB to import, so they
+    # are only loaded once a config actually selects the cross-encoder.
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
-def rerank_cross_encoder(query: str, chunks: List[str]):
-    model_name = "distilbert-base-uncased"
-    top_k = 4
+    logger.info(f"Loading cross-encoder model: {model_name}")
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModelForSequenceClassification.from_pretrained(model_name)
-
-    inputs = tokenizer(
-        [[query, chunk] for chunk in chunks],
-        padding=True,
-        truncation=True,
-        return_tensors="pt",
-    )
-
-    with torch.no_grad():
-        outputs = model(**inputs)
-        scores = outputs.logits[:, 0]
-        # Assuming binary classification: relevance score is the first logit
-
-    chunk_scores = [(chunk, score.item()) for chunk, score in zip(chunks, scores)]
-    sorted_chunks = sorted(chunk_scores, key=lambda x: x[1], reverse=True)
-    sorted_chunks = [chunk for chunk, score in sorted_chunks]
-
-    return sorted_chunks[:top_k]
+    model.eval()
+    return tokenizer, model
+
+
+def rerank_cross_encoder_batch(
+    queries: List[str],
+    chunks_per_query: List[List[str]],
+    top_k: int = 4,
+    model_name: str = "distilbert-base-uncased",
+    batch_size: int = 64,
+):
+    # Pairs from all queries share forward passes of up to batch_size pairs.
+    if not any(chunks_per_query):
+        return [[] for _ in chunks_per_query]
+
+    import torch
+
+    tokenizer, model = load_cross_encoder(model_name)
+
+    pairs = [[query, chunk] for query, chunks in zip(queries, chunks_per_query) for chunk in chunks]
+    scores = []
+    for start in range(0, len(pairs), batch_size):
+        inputs = tokenizer(
+            pairs[start:start + batch_size],
+            padding=True,
+            truncation=True,
+            return_tensors="pt",
+        )
+        with torch.no_grad():
+            outputs = model(**inputs)
+            # Assuming binary classification: relevance score is the first logit
+            scores.extend(outputs.logits[:, 0].tolist())
+
+    results = []
+    offset = 0
+    for chunks in chunks_per_query:
+        chunk_scores = zip(chunks, scores[offset:offset + len(chunks)])
+        offset += len(chunks)
+        sorted_chunks = sorted(chunk_scores, key=lambda x: x[1], reverse=True)
+        results.append([chunk for chunk, score in sorted_chunks][:top_k])
+    return results
+
+
+def rerank_cross_encoder(
+    query: str,
+    chunks: List[str],
+    top_k: int = 4,
+    model_name: str = "distilbert-base-uncased",
+):
+    return rerank_cross_encoder_batch([query], [chunks], top_k=top_k, model_name=model_name)[0]
 
 
 def rerank_chunks(cfg, query: str, chunks: List[str]):
     try:
-        reranker_type = cfg["reranker"]
+        reranker_type, params = component_spec(cfg, "reranker")
         if reranker_type == "bm25":
-            sorted_chunks = rerank_bm25(query, chunks)
+            sorted_chunks = rerank_bm25(query, chunks, top_k=params.get("k"))
         elif reranker_type == "cross_encoder":
-            sorted_chunks = rerank_cross_encoder(query, chunks)
+            sorted_chunks = rerank_cross_encoder(
+                query,
+                chunks,
+                top_k=params.get("k", 4),
+                model_name=params.get("model_name", "distilbert-base-uncased"),
+            )
         else:
             raise ValueError(f"Unknown ranking type: {reranker_type}")
 
@@ -64,3 +107,20 @@ def rerank_chunks(cfg, query: str, chunks: List[str]):
     except Exception as e:
         logger.error("Error: {}", e)
         raise
+
+
+def rerank_chunks_batch(cfg, queries: List[str], chunks_per_query: List[List[str]]):
+    reranker_type, params = component_spec(cfg, "reranker")
+    if reranker_type == "bm25":
+        return [
+            rerank_bm25(query, chunks, top_k=params.get("k"))
+            for query, chunks in zip(queries, chunks_per_query)
+        ]
+    if reranker_type == "cross_encoder":
+        return rerank_cross_encoder_batch(
+            queries,
+            chunks_per_query,
+            top_k=params.get("k", 4),
+            model_name=params.get("model_name", "distilbert-base-uncased"),
+        )
+    raise ValueError(f"Unknown ranking type: {reranker_type}")
@@ -1,46 +1,238 @@
-from omegaconf import DictConfig, OmegaConf
+import weakref
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from omegaconf import OmegaConf
 from loguru import logger
 from langchain.schema import Document
+from rank_bm25 import BM25Okapi
+
+from .utils import tokenize_text
+
+RRF_CONSTANT = 60
+
+_bm25_indexes = weakref.WeakKeyDictionary()
+_vector_indexes = weakref.WeakKeyDictionary()
+
+
+def unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def component_spec(cfg, key: str):
+    # Accepts a bare name, a flat {"name": ..., "k": ...} mapping, or a config
+    # section holding the selected name next to the settings of every option.
+    spec = cfg[key]
+    if isinstance(spec, str):
+        return spec, {}
+    name = spec["name"]
+    return name, spec.get(name) or spec
+
+
+def store_documents(store) -> List[Document]:
+    if hasattr(store, "store"):
+        # langchain_core InMemoryVectorStore
+        return [
+            Document(id=doc_id, page_content=doc["text"], metadata=doc["metadata"])
+            for doc_id, doc in store.store.items()
+        ]
+    if hasattr(store, "col"):
+        # langchain_milvus Milvus
+        if store.col is None:
+            return []
+        # A single query returns at most 16384 rows, so page through the
+        # collection; vectors are not needed for BM25 and are left out.
+        iterator = store.col.query_iterator(
+            batch_size=1000,
+            output_fields=[field for field in store.fields if field != store._vector_field],
+        )
+        documents = []
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                for row in rows:
+                    text = row.pop(store._text_field)
+                    documents.append(Document(page_content=text, metadata=row))
+        finally:
+            iterator.close()
+        return documents
+    raise ValueError(f"Unsupported store for BM25 retrieval: {type(store).__name__}")
+
+
+def store_vectors(store, documents: Sequence[Document]) -> Optional[np.ndarray]:
+    # Embeddings already stored alongside the documents, in the same order;
+    # None when some document cannot be matched back to its stored row.
+    if hasattr(store, "store"):
+        rows = [store.store.get(doc.id) for doc in documents]
+        if any(row is None for row in rows):
+            return None
+        return np.array([row["vector"] for row in rows], dtype=np.float32)
+    if hasattr(store, "col"):
+        primary_field = store._primary_field
+        ids = [doc.metadata.get(primary_field) for doc in documents]
+        if store.col is None or any(pk is None for pk in ids):
+            return None
+        rows = store.col.query(
+            expr=f"{primary_field} in {ids}",
+            output_fields=[primary_field, store._vector_field],
+        )
+        vectors = {row[primary_field]: row[store._vector_field] for row in rows}
+        if any(pk not in vectors for pk in ids):
+            return None
+        return np.array([vectors[pk] for pk in ids], dtype=np.float32)
+    return None
+
+
+def _document_count(store) -> int:
+    if hasattr(store, "store"):
+        return len(store.store)
+    if hasattr(store, "col"):
+        return store.col.num_entities if store.col is not None else 0
+    return -1
+
 
-from .mistral import MistralEmbed
+def _bm25_index(store):
+    count = _document_count(store)
+    cached = _bm25_indexes.get(store)
+    if cached is not None and cached[0] == count:
+        return cached[1], cached[2]
 
+    documents = store_documents(store)
+    logger.debug("Building BM25 index over {} documents", len(documents))
+    bm25 = BM25Okapi([tokenize_text(doc.page_content) for doc in documents]) if documents else None
+    _bm25_indexes[store] = (count, bm25, documents)
+    return bm25, documents
 
-def retrieve_bm25(query: str, store):
-    embedder = MistralEmbed()
-    query_vector = embedder(query)
 
-    search_param = {"nprobe": 16}
-    logger.debug("Searching ... ")
-    param = {
-        "collection_name": "pdf_documents",
-        "query_records": query_vector,
-        "top_k": 10,
-        "params": search_param,
-    }
-    status, results = store.search(**param)
-    if status.OK():
-        return results
-    else:
-        logger.debug("Search failed.", status)
+def _vector_index(store):
+    # Normalized matrix of every stored vector, rebuilt when documents are added.
+    count = len(store.store)
+    cached = _vector_indexes.get(store)
+    if cached is not None and cached[0] == count:
+        return cached[1], cached[2]
 
+    ids = list(store.store)
+    matrix = np.array([store.store[doc_id]["vector"] for doc_id in ids], dtype=np.float32)
+    matrix = unit_rows(matrix) if ids else matrix
+    _vector_indexes[store] = (count, ids, matrix)
+    return ids, matrix
 
-def retrieve_chunks(cfg, query: str, store):
+
+def retrieve_bm25(query: str, store, k: int = 4) -> List[Document]:
+    bm25, documents = _bm25_index(store)
+    if bm25 is None:
+        return []
+    scores = bm25.get_scores(tokenize_text(query))
+    ranked = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+    return [documents[i] for i in ranked[:k]]
+
+
+def retrieve_vectorstore(
+    query: str, store, k: int = 4, query_vector: Optional[Sequence[float]] = None
+) -> List[Document]:
+    if query_vector is not None:
+        return store.similarity_search_by_vector(list(query_vector), k=k)
+    return store.similarity_search(query, k=k)
+
+
+def retrieve_vectorstore_batch(store, query_vectors, k: int = 4) -> List[List[Document]]:
+    if hasattr(store, "store"):
+        # langchain_core InMemoryVectorStore: one matrix product for the batch.
+        ids, matrix = _vector_index(store)
+        if not ids:
+            return [[] for _ in query_vectors]
+        scores = unit_rows(np.asarray(query_vectors, dtype=np.float32)) @ matrix.T
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return [
+            [
+                Document(
+                    id=ids[i],
+                    page_content=store.store[ids[i]]["text"],
+                    metadata=store.store[ids[i]]["metadata"],
+                )
+                for i in row
+            ]
+            for row in top
+        ]
+    if hasattr(store, "col"):
+        # langchain_milvus Milvus: one search request for the batch.
+        if store.col is None:
+            return [[] for _ in query_vectors]
+        if store.enable_dynamic_field:
+            output_fields = ["*"]
+        else:
+            output_fields = [field for field in store.fields if field != store._vector_field]
+        results = store.col.search(
+            data=[list(vector) for vector in query_vectors],
+            anns_field=store._vector_field,
+            param=store.search_params,
+            limit=k,
+            output_fields=output_fields,
+        )
+        return [
+            [store._parse_document({x: hit.entity.get(x) for x in hit.entity.fields}) for hit in hits]
+            for hits in results
+        ]
+    return [retrieve_vectorstore("", store, k=k, query_vector=vector) for vector in query_vectors]
+
+
+def _reciprocal_rank_fusion(ranked_lists, k: int) -> List[Document]:
+    # Weighted reciprocal rank fusion, as in langchain's EnsembleRetriever.
+    scores = {}
+    documents = {}
+    for weight, ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = doc.page_content
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + weight / (rank + RRF_CONSTANT)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
+
+
+def retrieve_ensemble(
+    query: str,
+    store,
+    retrievers,
+    k: int = 4,
+    query_vector: Optional[Sequence[float]] = None,
+) -> List[Document]:
+    ranked_lists = []
+    for retriever in retrievers:
+        config = OmegaConf.create({"retriever": {"name": retriever["name"], "k": k}})
+        ranked_lists.append((
+            retriever.get("weight", 1.0),
+            retrieve_chunks(config, query, store, query_vector=query_vector),
+        ))
+    return _reciprocal_rank_fusion(ranked_lists, k)
+
+
+def retrieve_chunks(
+    cfg,
+    query: str,
+    store,
+    k: Optional[int] = None,
+    query_vector: Optional[Sequence[float]] = None,
+):
     try:
-        retriever_type = cfg["retriever"]
+        retriever_type, params = component_spec(cfg, "retriever")
+        k = k or params.get("k", 4)
         chunks = []
 
         if retriever_type == "bm25":
-            chunks = retrieve_bm25(query, store)
+            chunks = retrieve_bm25(query, store, k=k)
         elif retriever_type == "vectorstore":
-            retriever = store.as_retriever()
-            chunks = retriever.invoke(query)
+            chunks = retrieve_vectorstore(query, store, k=k, query_vector=query_vector)
         elif retriever_type == "ensemble":
-            retrievers = cfg["retriever"]["retrievers"]
-            chunks = []
-            for retriever in retrievers:
-                config = OmegaConf.create({"retriever": retriever})
-                chunks.extend(retrieve_chunks(config, query, store))
-            chunks = list(dict.fromkeys(chunks))
+            chunks = retrieve_ensemble(
+                query, store, params["retrievers"], k=k, query_vector=query_vector
+            )
         else:
             raise ValueError(f"Unknown ranking type: {retriever_type}")
 
@@ -57,3 +249,32 @@ def retrieve_chunks(cfg, query: str, store):
     except Exception as e:
         logger.error("Error: {}", e)
         raise
+
+
+def retrieve_chunks_batch(
+    cfg,
+    queries: Sequence[str],
+    store,
+    k: Optional[int] = None,
+    query_vectors=None,
+) -> List[List[Document]]:
+    retriever_type, params = component_spec(cfg, "retriever")
+    k = k or params.get("k", 4)
+
+    if retriever_type == "bm25":
+        return [retrieve_bm25(query, store, k=k) for query in queries]
+    if retriever_type == "vectorstore":
+        if query_vectors is None:
+            query_vectors = store.embeddings.embed_documents(list(queries))
+        return retrieve_vectorstore_batch(store, query_vectors, k=k)
+    if retriever_type == "ensemble":
+        members = []
+        for retriever in params["retrievers"]:
+            config = OmegaConf.create({"retriever": {"name": retriever["name"], "k": k}})
+            results = retrieve_chunks_batch(config, queries, store, query_vectors=query_vectors)
+            members.append((retriever.get("weight", 1.0), results))
+        return [
+            _reciprocal_rank_fusion([(weight, results[i]) for weight, results in members], k)
+            for i in range(len(queries))
+        ]
+    raise ValueError(f"Unknown ranking type: {retriever_type}")
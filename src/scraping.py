@@ -1,82 +1,275 @@
+import hashlib
+import re
 import requests
 from bs4 import BeautifulSoup
 import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from defusedxml import ElementTree
 from loguru import logger
 
+SKIPPED_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".css", ".js",
+    ".json", ".xml", ".pdf", ".zip", ".gz", ".tar", ".mp3", ".mp4", ".woff",
+    ".woff2", ".ttf",
+)
+REQUEST_TIMEOUT = 30
+
+
+def _remove_dot_segments(path: str) -> str:
+    segments = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(segments) > 1:
+                segments.pop()
+        elif segment != ".":
+            segments.append(segment)
+    if path.endswith(("/.", "/..")):
+        segments.append("")
+    return "/".join(segments) or "/"
+
 
-def scrape_page(url):
+def normalize_url(url: str, base_url: Optional[str] = None) -> Optional[str]:
+    url = url.strip()
+    if base_url is not None:
+        url = urljoin(base_url, url)
+    elif "://" not in url and not re.match(r"[a-zA-Z][\w+.-]*:(?!\d)", url):
+        url = "https://" + url
+
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
     try:
-        response = requests.get(url)
-        response.raise_for_status()
+        port = parts.port
+    except ValueError:
+        return None
+    host = parts.hostname.lower()
+    if port and (parts.scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    path = _remove_dot_segments(parts.path or "/")
+    return urlunsplit((parts.scheme, host, path, parts.query, ""))
 
-        soup = BeautifulSoup(response.content, "html.parser")
 
-        for script in soup(["script", "style"]):
-            script.extract()
+def crawl_scope(start_url: str) -> str:
+    parts = urlsplit(start_url)
+    path = parts.path if parts.path.endswith("/") else parts.path.rsplit("/", 1)[0] + "/"
+    return urlunsplit((parts.scheme, parts.netloc, path, "", ""))
 
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = "\n".join(chunk for chunk in chunks if chunk)
 
-        return text
-    except requests.exceptions.RequestException as e:
-        logger.info(f"Ошибка при запросе к {url}: {e}")
+def in_scope(url: str, scope: str) -> bool:
+    parts, scope_parts = urlsplit(url), urlsplit(scope)
+    return (
+        parts.netloc == scope_parts.netloc
+        and parts.path.startswith(scope_parts.path)
+        and not parts.path.lower().endswith(SKIPPED_EXTENSIONS)
+    )
+
+
+def make_absolute_url(base_url, relative_url):
+    return normalize_url(relative_url, base_url)
+
+
+def extract_text(soup: BeautifulSoup) -> str:
+    for script in soup(["script", "style"]):
+        script.extract()
+
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def extract_links(soup: BeautifulSoup, url: str) -> List[str]:
+    base = soup.find("base", href=True)
+    base_url = urljoin(url, base["href"]) if base else url
+    links = []
+    for link in soup.find_all("a", href=True):
+        absolute_url = make_absolute_url(base_url, link["href"])
+        if absolute_url is not None:
+            links.append(absolute_url)
+    return list(dict.fromkeys(links))
+
+
+def fetch(
+    session: requests.Session,
+    url: str,
+    cache=None,
+    fresh_since: Optional[float] = None,
+    stats: Optional[dict] = None,
+) -> Tuple[bytes, Optional[str], str, bool]:
+    """Return (body, content type, final url, whether the network was used).
+
+    With a cache the request is conditional, and it is skipped entirely when
+    the cached copy is newer than ``fresh_since`` (e.g. a sitemap lastmod).
+    """
+    stats = stats if stats is not None else {}
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None and fresh_since is not None and cached["fetched_at"] >= fresh_since:
+        stats["skipped"] = stats.get("skipped", 0) + 1
+        return cached["body"], cached["content_type"], cached["final_url"], False
+
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    stats["requests"] = stats.get("requests", 0) + 1
+    if response.status_code == 304 and cached is not None:
+        stats["not_modified"] = stats.get("not_modified", 0) + 1
+        cache.touch(url)
+        return cached["body"], cached["content_type"], response.url, True
+    response.raise_for_status()
+
+    body = response.content
+    content_type = response.headers.get("Content-Type")
+    stats["bytes_downloaded"] = stats.get("bytes_downloaded", 0) + len(body)
+    if cache is not None:
+        cache.put(
+            url,
+            body,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_type=content_type,
+            final_url=response.url,
+        )
+    return body, content_type, response.url, True
+
+
+def _parse_lastmod(value: Optional[str]) -> Optional[float]:
+    if not value:
         return None
-    except Exception as e:
-        logger.info(f"Ошибка при обработке {url}: {e}")
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+    except ValueError:
         return None
 
 
-def get_links(url):
+def read_sitemap(
+    session: requests.Session, url: str, cache=None, stats: Optional[dict] = None, depth: int = 0
+) -> List[Tuple[str, Optional[float]]]:
     try:
-        response = requests.get(url)
-        response.raise_for_status()
+        body, _, _, _ = fetch(session, url, cache, stats=stats)
+        root = ElementTree.fromstring(body)
+    except requests.exceptions.RequestException:
+        return []
+    except Exception as e:
+        logger.info(f"Ошибка при обработке {url}: {e}")
+        return []
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        links = []
-        for link in soup.find_all("a", href=True):
-            absolute_url = make_absolute_url(url, link["href"])
-            links.append(absolute_url)
-        return links
+    entries = []
+    for element in root:
+        fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in element}
+        loc = fields.get("loc")
+        if not loc:
+            continue
+        if root.tag.endswith("sitemapindex"):
+            if depth < 2:
+                entries.extend(read_sitemap(session, loc, cache, stats, depth + 1))
+        else:
+            entries.append((loc, _parse_lastmod(fields.get("lastmod"))))
+    return entries
+
+
+def sitemap_urls(session: requests.Session, scope: str, cache=None, stats=None):
+    parts = urlsplit(scope)
+    candidates = [urljoin(scope, "sitemap.xml"), urlunsplit((parts.scheme, parts.netloc, "/sitemap.xml", "", ""))]
+    for sitemap in dict.fromkeys(candidates):
+        entries = read_sitemap(session, sitemap, cache, stats)
+        if entries:
+            logger.info(f"Found {len(entries)} URLs in {sitemap}")
+            return entries
+    return []
+
+
+def _fetch_page(session, url, cache, lastmod, stats, delay, with_links):
+    used_network = True
+    try:
+        body, content_type, final_url, used_network = fetch(
+            session, url, cache, fresh_since=lastmod, stats=stats
+        )
+        if content_type and "html" not in content_type:
+            return None
+        final_url = normalize_url(final_url) or url
+        soup = BeautifulSoup(body, "html.parser")
+        links = extract_links(soup, final_url) if with_links else []
+        return final_url, body, extract_text(soup), links
     except requests.exceptions.RequestException as e:
         logger.info(f"Ошибка при запросе к {url}: {e}")
-        return []
     except Exception as e:
         logger.info(f"Ошибка при обработке {url}: {e}")
-        return []
+    finally:
+        if used_network and delay:
+            time.sleep(delay)
+    return None
 
 
-def make_absolute_url(base_url, relative_url):
-    if relative_url.startswith("http"):
-        return relative_url
-    else:
-        return base_url.rstrip("/") + "/" + relative_url.lstrip("/")
+def web_scraper(
+    start_url,
+    max_depth=1,
+    delay=1.0,
+    cache=None,
+    max_pages=None,
+    use_sitemap=True,
+    stats=None,
+):
+    start_url = normalize_url(start_url)
+    if start_url is None:
+        logger.info("Некорректный URL для обхода")
+        return []
 
+    stats = stats if stats is not None else {}
+    session = requests.Session()
 
-def web_scraper(start_url, max_depth=1):
+    # The scope is only known once the start page is fetched: "/docs" that
+    # redirects to "/docs/" must be scoped to "/docs/", not to the whole host.
+    scope = None
+    urls_to_scrape = deque([(start_url, 0, None)])
+    queued_urls = {start_url}
+    page_hashes = set()
     scraped_pages = []
-    urls_to_scrape = [(start_url, 0)]
-    scraped_urls = set()
+    while urls_to_scrape and (max_pages is None or len(scraped_pages) < max_pages):
+        current_url, current_depth, lastmod = urls_to_scrape.popleft()
 
-    while urls_to_scrape:
-        current_url, current_depth = urls_to_scrape.pop(0)
-
-        if current_url in scraped_urls or current_depth > max_depth:
+        logger.info(f"Scraping: {current_url} (depth {current_depth})")
+        page = _fetch_page(
+            session, current_url, cache, lastmod, stats, delay, current_depth < max_depth
+        )
+        if scope is None:
+            scope = crawl_scope(page[0] if page is not None else start_url)
+            if use_sitemap:
+                # Sitemap entries are fetched but not expanded further: the sitemap is
+                # already the list of pages, following their links only finds duplicates.
+                for url, lastmod in sitemap_urls(session, scope, cache, stats):
+                    url = normalize_url(url)
+                    if url is not None and url not in queued_urls and in_scope(url, scope):
+                        queued_urls.add(url)
+                        urls_to_scrape.append((url, max_depth, lastmod))
+        if page is None:
             continue
 
-        logger.info(f"Scraping: {current_url} (depth {current_depth})")
-        page_text = scrape_page(current_url)
+        final_url, body, page_text, links = page
+        queued_urls.add(final_url)
+        # The same page can be reachable under several URLs ("/docs/" and
+        # "/docs/index.html", or through redirects): index it only once.
+        page_hash = hashlib.sha256(body).digest()
+        if page_hash in page_hashes:
+            stats["duplicates"] = stats.get("duplicates", 0) + 1
+            continue
+        page_hashes.add(page_hash)
 
         if page_text:
             scraped_pages.append(page_text)
-            scraped_urls.add(current_url)
-
-            if current_depth < max_depth:
-                links = get_links(current_url)
-                for link in links:
-                    urls_to_scrape.append((link, current_depth + 1))
-
-        time.sleep(1)
+            for link in links:
+                if link not in queued_urls and in_scope(link, scope):
+                    queued_urls.add(link)
+                    urls_to_scrape.append((link, current_depth + 1, None))
 
+    stats["pages"] = len(scraped_pages)
+    logger.info(f"Crawl of {start_url} finished: {stats}")
     return scraped_pages
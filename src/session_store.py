@@ -0,0 +1,291 @@
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    config_name TEXT,
+    collection_name TEXT,
+    document_version INTEGER NOT NULL DEFAULT 0,
+    next_version INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chat_messages_session ON chat_messages (session_id, id);
+CREATE TABLE IF NOT EXISTS session_locks (
+    session_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SessionBusyError(TimeoutError):
+    pass
+
+
+class SessionStore(ABC):
+    """State shared by all API workers: which vector store collection holds a
+    session's documents, its document version and its chat history.
+
+    Backends implement the methods below; a networked key-value store only
+    needs atomic version allocation, compare-and-set on the document version
+    and lease-style locks.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, lock_lease: float = 120):
+        self.ttl_seconds = ttl_seconds
+        self.lock_lease = lock_lease
+        self._owner = uuid.uuid4().hex
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def next_document_version(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_document(
+        self, session_id: str, collection_name: str, config_name: str, version: int
+    ) -> Optional[Tuple[str, str]]:
+        """Point the session at a new collection unless a newer version won.
+
+        Returns the (config_name, collection_name) that is no longer referenced
+        and should be dropped, if any.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_chat_history(self, session_id: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def append_chat_message(self, session_id: str, question: str, answer: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def reset_chat_history(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def expire(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Delete expired sessions and return their collections to drop."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _try_acquire(self, session_id: str, owner: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _release(self, session_id: str, owner: str):
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, session_id: str, timeout: float = 30.0):
+        owner = f"{self._owner}:{threading.get_ident()}"
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while not self._try_acquire(session_id, owner):
+            if time.monotonic() >= deadline:
+                raise SessionBusyError(f"Session {session_id} is busy")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+        try:
+            yield
+        finally:
+            self._release(session_id, owner)
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str, ttl_seconds: float = 86400, lock_lease: float = 120):
+        super().__init__(ttl_seconds=ttl_seconds, lock_lease=lock_lease)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+        logger.info(f"Using SQLite session store: {path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT * FROM sessions WHERE session_id = ? AND expires_at >= ?",
+            (session_id, time.time()),
+        ).fetchone()
+        if row is None or row["collection_name"] is None:
+            return None
+        return dict(row)
+
+    def next_document_version(self, session_id: str) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None and row["expires_at"] < now:
+                # Expired but not purged yet: the old history goes now, and the row
+                # stays expired so its collection is neither served again nor
+                # missed by expire(); set_document replaces it when indexing ends.
+                conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+                conn.execute(
+                    "UPDATE sessions SET next_version = next_version + 1 WHERE session_id = ?",
+                    (session_id,),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO sessions (session_id, next_version, updated_at, expires_at) "
+                    "VALUES (?, 1, ?, ?) ON CONFLICT (session_id) DO UPDATE SET "
+                    "next_version = next_version + 1, updated_at = excluded.updated_at, "
+                    "expires_at = excluded.expires_at",
+                    (session_id, now, now + self.ttl_seconds),
+                )
+            return conn.execute(
+                "SELECT next_version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def set_document(
+        self, session_id: str, collection_name: str, config_name: str, version: int
+    ) -> Optional[Tuple[str, str]]:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT config_name, collection_name, document_version FROM sessions "
+                "WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is not None and row["document_version"] > version:
+                return config_name, collection_name
+            conn.execute(
+                "INSERT INTO sessions (session_id, config_name, collection_name, "
+                "document_version, next_version, updated_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (session_id) DO UPDATE SET "
+                "config_name = excluded.config_name, "
+                "collection_name = excluded.collection_name, "
+                "document_version = excluded.document_version, "
+                "updated_at = excluded.updated_at, expires_at = excluded.expires_at",
+                (session_id, config_name, collection_name, version, version,
+                 now, now + self.ttl_seconds),
+            )
+        if row is not None and row["collection_name"] is not None:
+            return row["config_name"], row["collection_name"]
+        return None
+
+    def get_chat_history(self, session_id: str) -> str:
+        rows = self._connection().execute(
+            "SELECT question, answer FROM chat_messages JOIN sessions USING (session_id) "
+            "WHERE session_id = ? AND sessions.expires_at >= ? ORDER BY id",
+            (session_id, time.time()),
+        ).fetchall()
+        return "".join(
+            f"\n human: {row['question']} \n assistant: {row['answer']}" for row in rows
+        )
+
+    def append_chat_message(self, session_id: str, question: str, answer: str):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO chat_messages (session_id, question, answer, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, question, answer, now),
+            )
+            conn.execute(
+                "UPDATE sessions SET updated_at = ?, expires_at = ? WHERE session_id = ?",
+                (now, now + self.ttl_seconds, session_id),
+            )
+
+    def reset_chat_history(self, session_id: str) -> bool:
+        with self._transaction() as conn:
+            deleted = conn.execute(
+                "DELETE FROM chat_messages WHERE session_id = ?", (session_id,)
+            ).rowcount
+        return deleted > 0
+
+    def expire(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT session_id, config_name, collection_name FROM sessions "
+                "WHERE expires_at < ?",
+                (now,),
+            ).fetchall()
+            session_ids = [(row["session_id"],) for row in rows]
+            conn.executemany("DELETE FROM chat_messages WHERE session_id = ?", session_ids)
+            conn.executemany("DELETE FROM session_locks WHERE session_id = ?", session_ids)
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", session_ids)
+        if rows:
+            logger.info(f"Expired {len(rows)} sessions")
+        return [
+            (row["config_name"], row["collection_name"])
+            for row in rows
+            if row["collection_name"] is not None
+        ]
+
+    def _try_acquire(self, session_id: str, owner: str) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM session_locks WHERE session_id = ? AND expires_at < ?",
+                (session_id, now),
+            )
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO session_locks (session_id, owner, expires_at) "
+                "VALUES (?, ?, ?)",
+                (session_id, owner, now + self.lock_lease),
+            ).rowcount
+        return inserted == 1
+
+    def _release(self, session_id: str, owner: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM session_locks WHERE session_id = ? AND owner = ?",
+                (session_id, owner),
+            )
+
+
+def build_session_store(cfg) -> SessionStore:
+    store_cfg = cfg.session_store
+    if store_cfg.backend == "sqlite":
+        return SQLiteSessionStore(
+            store_cfg.path,
+            ttl_seconds=store_cfg.ttl_seconds,
+            lock_lease=store_cfg.lock_lease,
+        )
+    raise ValueError(f"Unknown session store backend: {store_cfg.backend}")
@@ -1,7 +1,5 @@
-from typing import List, Dict
+from typing import List, Optional
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_milvus import Milvus
-from pymilvus import connections, utility
 from loguru import logger
 
 from .mistral import MistralEmbed
@@ -10,14 +8,39 @@ from .scraping import web_scraper
 
 class URLProcessor:
     def __init__(
-        self, collection_name: str, uri_connection: str = "http://localhost:19530"
+        self,
+        collection_name: str,
+        uri_connection: str = "http://localhost:19530",
+        vector_store=None,
+        embed_model: Optional[MistralEmbed] = None,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
+        max_depth: int = 1,
+        crawl_delay: float = 1.0,
+        max_pages: Optional[int] = None,
+        use_sitemap: bool = True,
+        crawl_cache=None,
     ):
         self.collection_name = collection_name
         self.uri_connection = uri_connection
-        self._embed_model: MistralEmbed = MistralEmbed()
-        self.vector_store = self.init_vectorstore_collection()
+        self.max_depth = max_depth
+        self.crawl_delay = crawl_delay
+        self.max_pages = max_pages
+        self.use_sitemap = use_sitemap
+        self.crawl_cache = crawl_cache
+        self.crawl_stats = {}
+        self._embed_model: MistralEmbed = embed_model or MistralEmbed()
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+        if vector_store is None:
+            vector_store = self.init_vectorstore_collection()
+        self.vector_store = vector_store
 
     def init_vectorstore_collection(self):
+        from langchain_milvus import Milvus
+        from pymilvus import connections, utility
+
         connections.connect(alias="default", uri=self.uri_connection, secure=False)
 
         if utility.has_collection(self.collection_name):
@@ -31,23 +54,25 @@ class URLProcessor:
             auto_id=True,
         )
 
-    @staticmethod
-    def load_url(file_url: str) -> List[Dict[str, str]]:
-        documents = web_scraper(file_url)
+    def load_url(self, file_url: str) -> List[str]:
+        self.crawl_stats = {}
+        documents = web_scraper(
+            file_url,
+            max_depth=self.max_depth,
+            delay=self.crawl_delay,
+            cache=self.crawl_cache,
+            max_pages=self.max_pages,
+            use_sitemap=self.use_sitemap,
+            stats=self.crawl_stats,
+        )
         # logger.info(f"Loading PDF file: {file_path}")
         # loader = PyPDFLoader(file_path)
         # documents = loader.load()
         # logger.info(f"Loaded {len(documents)} pages from PDF.")
         return documents
 
-    @staticmethod
-    def split_text(
-        content: str, chunk_size: int = 512, chunk_overlap: int = 50
-    ) -> List[str]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=chunk_overlap
-        )
-        return splitter.split_text(content)
+    def split_text(self, content: str) -> List[str]:
+        return self._splitter.split_text(content)
 
     def process_url(self, file_url: str):
         documents = self.load_url(file_url)
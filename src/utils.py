@@ -1,16 +1,23 @@
-from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+from functools import lru_cache
 from typing import List
 import re
 
-tokenizer_embed = MistralTokenizer.v1()
+
+@lru_cache(maxsize=None)
+def get_tokenizer_embed():
+    # Imported and built on first use: loading the tokenizer takes a noticeable
+    # share of API startup and most requests never need token counts.
+    from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+
+    return MistralTokenizer.v1()
 
 
 def get_token_count_embedding(text: str) -> int:
     return (
         len(
-            tokenizer_embed.instruct_tokenizer.encode_user_content(text, is_last=True)[
-                0
-            ]
+            get_tokenizer_embed().instruct_tokenizer.encode_user_content(
+                text, is_last=True
+            )[0]
         )
         + 2
     )
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**limits):
+    params = dict(max_concurrency=1, max_queue=10, max_per_session=2, queue_timeout=1.0)
+    params.update(limits)
+    return AdmissionController("chat", **params)
+
+
+def test_queued_requests_count_toward_session_limit():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("a")
+        queued = asyncio.ensure_future(admission.acquire("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("a")
+        assert rejected.value.status_code == 429
+
+        admission.release("a")
+        await queued
+        admission.release("a")
+        assert admission.stats == {"running": 0, "queued": 0}
+        assert not admission._sessions
+
+    asyncio.run(scenario())
+
+
+def test_session_cannot_hold_every_slot():
+    async def scenario():
+        admission = controller(max_concurrency=4)
+        await admission.acquire("a")
+        await admission.acquire("a")
+        with pytest.raises(AdmissionRejected):
+            await admission.acquire("a")
+        assert admission.stats["running"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_or_timed_out_waiters_free_their_session_slot():
+    async def scenario():
+        admission = controller(queue_timeout=0.05)
+        await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("a")
+        assert rejected.value.status_code == 503
+
+        waiter = asyncio.ensure_future(admission.acquire("a"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission._sessions["a"] == 1
+        assert admission.stats == {"running": 1, "queued": 0}
+
+    asyncio.run(scenario())
+
+
+def test_waiting_sessions_are_served_round_robin():
+    async def scenario():
+        admission = controller(max_per_session=3)
+        await admission.acquire("a")
+        order = []
+
+        async def request(session_id):
+            await admission.acquire(session_id)
+            order.append(session_id)
+            await asyncio.sleep(0)
+            admission.release(session_id)
+
+        tasks = [asyncio.ensure_future(request(s)) for s in ("a", "a", "b", "c")]
+        await asyncio.sleep(0)
+        admission.release("a")
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c", "a"]
+
+    asyncio.run(scenario())
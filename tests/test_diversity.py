@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_core.vectorstores.utils import maximal_marginal_relevance as reference_mmr
+
+from src.diversity import (
+    diversify_chunks,
+    diversify_chunks_batch,
+    maximal_marginal_relevance,
+    maximal_marginal_relevance_batch,
+)
+from src.retriever import unit_rows
+
+
+def cosine(vectors, query):
+    return unit_rows(vectors) @ unit_rows(query)
+
+
+def test_matches_langchain_mmr():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n, dim = rng.integers(1, 30), rng.integers(2, 16)
+        k, lambda_mult = int(rng.integers(1, n + 3)), float(rng.random())
+        vectors = rng.normal(size=(n, dim))
+        query = rng.normal(size=dim)
+        expected = reference_mmr(query, list(vectors), lambda_mult=lambda_mult, k=k)
+        assert maximal_marginal_relevance(cosine(vectors, query), vectors, k, lambda_mult) == expected
+
+
+def test_batch_matches_single_queries():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(5, 12, 8))
+    relevance = rng.random(size=(5, 12))
+    selected = maximal_marginal_relevance_batch(relevance, vectors, 4, 0.3)
+    for i in range(5):
+        assert selected[i].tolist() == maximal_marginal_relevance(relevance[i], vectors[i], 4, 0.3)
+
+
+def test_edge_cases():
+    vectors = np.eye(3)
+    assert sorted(maximal_marginal_relevance(np.ones(3), vectors, 10)) == [0, 1, 2]
+    assert maximal_marginal_relevance(np.array([]), np.empty((0, 3)), 4) == []
+    assert maximal_marginal_relevance_batch(np.empty((2, 0)), np.empty((2, 0, 3)), 4).shape == (2, 0)
+
+
+def make_store(vectors):
+    documents = [Document(page_content=f"chunk {i}", id=str(i)) for i in range(len(vectors))]
+    store = SimpleNamespace(store={doc.id: {"vector": v} for doc, v in zip(documents, vectors)})
+    return documents, store
+
+
+def test_diversify_short_or_empty_candidate_lists_unchanged():
+    documents, store = make_store(np.eye(3))
+    assert diversify_chunks(documents, store, k=3) == documents
+    assert diversify_chunks([], store, k=3) == []
+
+
+def test_diversify_without_query_vector_follows_retriever_order():
+    # Chunks 0 and 1 are duplicates: rank-based relevance keeps chunk 0 first
+    # and MMR then prefers chunk 2 over the duplicate.
+    documents, store = make_store(np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]))
+    assert [doc.id for doc in diversify_chunks(documents, store, k=2)] == ["0", "2"]
+    ordered = diversify_chunks(documents, store, k=3, lambda_mult=1.0)
+    assert [doc.id for doc in ordered] == ["0", "1", "2"]
+
+
+def test_diversify_with_query_vector_uses_similarity():
+    documents, store = make_store(np.array([[1.0, 0.0], [0.0, 1.0], [0.1, 1.0]]))
+    selected = diversify_chunks(documents, store, k=1, query_vector=[0.0, 1.0])
+    assert [doc.id for doc in selected] == ["1"]
+
+
+def test_diversify_falls_back_to_top_k_without_stored_vectors():
+    documents, store = make_store(np.eye(4))
+    del store.store["2"]
+    assert diversify_chunks(documents, store, k=2) == documents[:2]
+
+
+@pytest.mark.parametrize("query_vectors", [None, np.array([[0.0, 1.0], [1.0, 0.0]])])
+def test_diversify_batch_matches_single(query_vectors):
+    rng = np.random.default_rng(2)
+    documents, store = make_store(rng.normal(size=(12, 2)))
+    candidates = [documents[:6], documents[6:]]
+    expected = [
+        diversify_chunks(
+            docs, store, k=3, query_vector=None if query_vectors is None else query_vectors[i]
+        )
+        for i, docs in enumerate(candidates)
+    ]
+    assert diversify_chunks_batch(candidates, store, k=3, query_vectors=query_vectors) == expected
@@ -0,0 +1,114 @@
+import pytest
+import requests
+
+from benchmarks.corpus import StaticSite
+from src.crawl_cache import CrawlCache
+from src.scraping import (
+    _remove_dot_segments,
+    crawl_scope,
+    fetch,
+    in_scope,
+    normalize_url,
+    web_scraper,
+)
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("", "/"),
+        ("/a/b/../c", "/a/c"),
+        ("/../a", "/a"),
+        ("/a/./b/.", "/a/b/"),
+        ("/a/b/..", "/a/"),
+    ],
+)
+def test_remove_dot_segments(path, expected):
+    assert _remove_dot_segments(path) == expected
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("Example.COM", "https://example.com/"),
+        ("localhost:8000/docs", "https://localhost:8000/docs"),
+        ("http://a.com:80/x/../y/./z#section", "http://a.com/y/z"),
+        ("https://a.com:8443", "https://a.com:8443/"),
+        ("mailto:someone@a.com", None),
+        ("javascript:void(0)", None),
+        ("ftp://a.com/file", None),
+        ("http://a.com:port/", None),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_relative_url():
+    assert normalize_url("../b?q=1#x", "http://a.com/x/y/z") == "http://a.com/x/b?q=1"
+
+
+def test_crawl_scope():
+    assert crawl_scope("http://a.com/docs") == "http://a.com/"
+    assert crawl_scope("http://a.com/docs/") == "http://a.com/docs/"
+    assert crawl_scope("http://a.com/docs/page.html") == "http://a.com/docs/"
+
+
+def test_in_scope():
+    scope = "http://a.com/docs/"
+    assert in_scope("http://a.com/docs/page.html", scope)
+    assert not in_scope("http://a.com/blog/", scope)
+    assert not in_scope("http://b.com/docs/", scope)
+    assert not in_scope("http://a.com/docs/logo.PNG", scope)
+
+
+@pytest.fixture
+def site(tmp_path):
+    docs = tmp_path / "site" / "docs"
+    (docs / "guide").mkdir(parents=True)
+    (docs / "index.html").write_text(
+        '<p>Docs home</p><a href="index.html">Home</a><a href="a.html">A</a>'
+        '<a href="guide/">Guide</a><a href="/other.html">Other</a>'
+    )
+    (docs / "a.html").write_text('<p>Page A</p><a href="./">Up</a>')
+    (docs / "guide" / "index.html").write_text('<p>Guide</p><a href="../a.html">A</a>')
+    (tmp_path / "site" / "other.html").write_text("<p>Outside the docs</p>")
+    with StaticSite(str(tmp_path / "site")) as server:
+        yield server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CrawlCache(str(tmp_path / "crawl_cache.db"))
+
+
+def test_fetch_revalidates_and_keeps_redirect_target(site, cache):
+    session = requests.Session()
+    stats = {}
+    body, _, final_url, used_network = fetch(session, site.url + "docs", cache, stats=stats)
+    assert final_url == site.url + "docs/"
+    assert used_network
+
+    cached_body, _, final_url, used_network = fetch(session, site.url + "docs", cache, stats=stats)
+    assert (cached_body, final_url, used_network) == (body, site.url + "docs/", True)
+    assert stats["not_modified"] == 1
+
+
+def test_fetch_skips_pages_fresher_than_lastmod(site, cache):
+    session = requests.Session()
+    fetch(session, site.url + "docs", cache)
+    stats = {}
+    _, _, final_url, used_network = fetch(session, site.url + "docs", cache, fresh_since=0, stats=stats)
+    assert (final_url, used_network) == (site.url + "docs/", False)
+    assert stats == {"skipped": 1}
+
+
+def test_crawl_is_scoped_after_redirect_and_skips_duplicates(site, cache):
+    stats = {}
+    pages = web_scraper(
+        site.url + "docs", max_depth=2, delay=0, cache=cache, use_sitemap=False, stats=stats
+    )
+    assert len(pages) == 3
+    assert [page.startswith(("Docs home", "Page A", "Guide")) for page in pages] == [True] * 3
+    assert not any("Outside" in page for page in pages)
+    assert stats["duplicates"] == 1
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from src import pipeline as pipeline_module
+from src.pipeline import RAGPipeline
+from src.session_store import SessionBusyError, SQLiteSessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=60, lock_lease=60)
+
+
+def test_versions_are_allocated_per_session(store):
+    assert [store.next_document_version("a") for _ in range(3)] == [1, 2, 3]
+    assert store.next_document_version("b") == 1
+    assert store.get_session("a") is None
+
+
+def test_older_version_does_not_replace_newer_document(store):
+    old = store.next_document_version("a")
+    new = store.next_document_version("a")
+
+    assert store.set_document("a", "c2", "config", new) is None
+    assert store.set_document("a", "c1", "config", old) == ("config", "c1")
+    assert store.get_session("a")["collection_name"] == "c2"
+
+    newest = store.next_document_version("a")
+    assert store.set_document("a", "c3", "config", newest) == ("config", "c2")
+    assert store.get_session("a")["document_version"] == newest
+
+
+def test_chat_history(store):
+    store.set_document("a", "c1", "config", store.next_document_version("a"))
+    store.append_chat_message("a", "q1", "a1")
+    store.append_chat_message("a", "q2", "a2")
+    assert store.get_chat_history("a") == "\n human: q1 \n assistant: a1\n human: q2 \n assistant: a2"
+
+    assert store.reset_chat_history("a")
+    assert store.get_chat_history("a") == ""
+    assert not store.reset_chat_history("a")
+
+
+def test_lock_is_exclusive_until_released(store):
+    acquired = []
+
+    def contend():
+        try:
+            with store.lock("a", timeout=0.05):
+                acquired.append(True)
+        except SessionBusyError:
+            acquired.append(False)
+
+    with store.lock("a"):
+        thread = threading.Thread(target=contend)
+        thread.start()
+        thread.join()
+    contend()
+    assert acquired == [False, True]
+
+
+def test_stale_lock_lease_is_taken_over(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), lock_lease=0.01)
+    assert store._try_acquire("a", "crashed-worker")
+    time.sleep(0.02)
+    with store.lock("a", timeout=0.1):
+        pass
+
+
+def test_expire_returns_collections_to_drop(store):
+    store.set_document("a", "c1", "config", store.next_document_version("a"))
+    store.append_chat_message("a", "q", "a")
+    store.next_document_version("b")
+
+    assert store.expire(now=time.time()) == []
+    assert store.expire(now=time.time() + 120) == [("config", "c1")]
+    assert store.get_session("a") is None
+    assert store.next_document_version("a") == 1
+
+
+def test_upload_after_expiry_does_not_revive_session(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=0.05)
+    store.set_document("a", "c1", "config", store.next_document_version("a"))
+    store.append_chat_message("a", "q", "a")
+    time.sleep(0.1)
+    assert store.get_session("a") is None
+    assert store.get_chat_history("a") == ""
+
+    version = store.next_document_version("a")
+    assert version == 2
+    assert store.get_session("a") is None
+    assert store.get_chat_history("a") == ""
+    assert store.expire() == [("config", "c1")]
+
+
+def test_replacing_expired_session_drops_its_collection(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl_seconds=0.05)
+    store.set_document("a", "c1", "config", store.next_document_version("a"))
+    store.append_chat_message("a", "q", "a")
+    time.sleep(0.1)
+
+    store.ttl_seconds = 60
+    version = store.next_document_version("a")
+    assert store.set_document("a", "c2", "config", version) == ("config", "c1")
+    assert store.get_session("a")["collection_name"] == "c2"
+    assert store.get_chat_history("a") == ""
+
+
+def test_index_document_drops_collection_when_indexing_fails(store, monkeypatch):
+    dropped = []
+
+    class BrokenProcessor:
+        def process_url(self, url):
+            raise RuntimeError("crawl failed")
+
+    monkeypatch.setattr(pipeline_module, "build_url_processor", lambda *args: BrokenProcessor())
+    monkeypatch.setattr(pipeline_module, "drop_vector_store", lambda *args: dropped.append(args))
+
+    pipeline = RAGPipeline(session_store=store)
+    with pytest.raises(RuntimeError):
+        pipeline.index_document("a", "https://example.com", "url", config_name="config")
+    assert dropped == [("config", pipeline_module.session_collection_name("config", "a", 1))]
+    assert store.get_session("a") is None